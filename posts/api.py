@@ -0,0 +1,260 @@
+"""JSON API только для чтения: ленты, пост и его комментарии.
+
+Ответы поддерживают условные GET. ETag собирается из версий пространств
+кеша (см. posts.cache), которые меняет шина инвалидации при каждой
+записи, а Last-Modified - из времени выдачи этих версий, так что правка,
+удаление и новый комментарий сдвигают его вперёд. Ответ 304 отдаётся
+до выборки строк: стоят только версии из кеша.
+
+delta отдаёт только посты ленты новее метки клиента (since_id или since)
+по тому же индексу, что и страницы лент, не больше FEED_DELTA_LIMIT за
+раз. Пока в ленте ничего не появилось, повторный опрос получает 304.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import condition, require_GET
+from django.views.decorators.vary import vary_on_cookie
+
+from . import cache, feed
+from .models import Group, Post, User
+from .paginator import CursorPaginator
+from .views import EVENT_ID, comments_page
+
+PER_PAGE = 10
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Требуется вход'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def conditional(namespaces):
+    """Условный GET по версиям пространств namespaces(...)."""
+    def names(request, *args, **kwargs):
+        if not hasattr(request, 'cache_namespaces'):
+            request.cache_namespaces = namespaces(request, *args, **kwargs)
+        return request.cache_namespaces
+
+    def etag(request, *args, **kwargs):
+        return cache.etag(
+            names(request, *args, **kwargs),
+            request.get_full_path(),
+        )
+
+    def last_modified(request, *args, **kwargs):
+        return cache.last_modified(*names(request, *args, **kwargs))
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(f'{request.path}?cursor={cursor}')
+
+
+def serialize_post(request, post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'comment_count': getattr(post, 'comment_count', None),
+        'image': request.build_absolute_uri(post.image.url)
+        if post.image else None,
+        'url': request.build_absolute_uri(
+            reverse('post', args=[post.author.username, post.pk])
+        ),
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }
+
+
+def feed_response(request, posts):
+    return page_response(
+        request, CursorPaginator(posts.for_feed(), PER_PAGE)
+    )
+
+
+def page_response(request, paginator):
+    page = paginator.get_page(
+        request.GET.get('cursor'),
+        request.GET.get('page')
+    )
+    return JsonResponse({
+        'results': [serialize_post(request, post) for post in page],
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    })
+
+
+def _group_id(slug):
+    return Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+
+
+def _author_id(username):
+    return User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+
+
+@require_GET
+@conditional(lambda request: [cache.INDEX])
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_GET
+@conditional(lambda request, slug: [cache.group(_group_id(slug))])
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@require_GET
+@conditional(
+    lambda request, username: [cache.profile(_author_id(username))]
+)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
+
+
+def _follow_namespaces(request):
+    request.pulled = list(feed.pulled_authors(request.user))
+    return feed.follow_namespaces(request.user, request.pulled)
+
+
+@require_GET
+@login_required
+@vary_on_cookie
+@conditional(_follow_namespaces)
+def follow_index(request):
+    return page_response(
+        request,
+        feed.FollowPaginator(request.user, PER_PAGE, request.pulled),
+    )
+
+
+@require_GET
+@conditional(lambda request, post_id: [cache.post(post_id)])
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    return JsonResponse(serialize_post(request, post))
+
+
+@require_GET
+@conditional(lambda request, post_id: [cache.post(post_id)])
+def post_comments(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    page = comments_page(request, post.comments.select_related('author'))
+    return JsonResponse({
+        'results': [serialize_comment(comment) for comment in page],
+        'next': _link(request, page.next_cursor),
+    })
+
+
+def _limit(value):
+    if value is None:
+        return settings.FEED_DELTA_LIMIT
+    if not value.isdigit() or not int(value):
+        raise ValueError('limit должен быть положительным числом')
+    return min(int(value), settings.FEED_DELTA_LIMIT)
+
+
+def _newer(posts, params):
+    """Посты новее метки клиента по возрастанию (pub_date, id).
+
+    None, если метки нет: клиент только начинает следить за лентой.
+    """
+    paginator = CursorPaginator(posts, 1)
+    since_id = params.get('since_id')
+    if since_id is not None:
+        if not EVENT_ID.fullmatch(since_id):
+            raise ValueError('since_id должен быть числом')
+        # Увиденный пост могли удалить: метка - ближайший более старый.
+        seen = Post.objects.filter(pk__lte=since_id).order_by(
+            '-pk'
+        ).values_list('pub_date', 'pk').first()
+        return paginator.after(seen and list(seen))
+    since = params.get('since')
+    if since is not None:
+        moment = parse_datetime(since)
+        if moment is None:
+            raise ValueError('since должен быть датой ISO 8601')
+        if timezone.is_naive(moment):
+            # Дата без смещения - в часовом поясе сайта.
+            moment = timezone.make_aware(moment, is_dst=False)
+        return paginator.after().filter(pub_date__gt=moment)
+    return None
+
+
+@conditional(lambda request, limit: request.feed_spec.channels)
+def _delta(request, limit):
+    posts = request.feed_spec.posts
+    newer = _newer(posts.for_feed(), request.GET)
+    if newer is None:
+        rows, has_more = [], False
+        mark = posts.order_by('-pub_date', '-pk').values_list(
+            'pk', 'pub_date'
+        ).first()
+    else:
+        rows = list(newer[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        mark = (rows[-1].pk, rows[-1].pub_date) if rows else None
+    params = request.GET.copy()
+    since_id = params.get('since_id')
+    if mark is not None:
+        # Следующий опрос продолжает с последнего отданного поста.
+        params.pop('since', None)
+        params['since_id'] = since_id = mark[0]
+    elif newer is None:
+        # Лента пуста: новым будет любой пост.
+        params['since_id'] = since_id = 0
+    return JsonResponse({
+        'results': [serialize_post(request, post) for post in rows],
+        'since_id': None if since_id is None else int(since_id),
+        # Полная точность: JSON-кодировщик Django обрезает микросекунды.
+        'since': mark[1].isoformat() if mark else params.get('since'),
+        'has_more': has_more,
+        'next': request.build_absolute_uri(
+            f'{request.path}?{params.urlencode()}'
+        ),
+    })
+
+
+@require_GET
+@vary_on_cookie
+def delta(request):
+    """Новые посты ленты feed=index|group|author|follow с прошлого опроса."""
+    try:
+        request.feed_spec = feed.resolve(request.GET, request.user)
+        limit = _limit(request.GET.get('limit'))
+    except PermissionDenied:
+        return JsonResponse({'detail': 'Требуется вход'}, status=401)
+    except ValueError as error:
+        return JsonResponse({'detail': str(error)}, status=400)
+    try:
+        return _delta(request, limit)
+    except ValueError as error:
+        return JsonResponse({'detail': str(error)}, status=400)
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from . import api
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", api.index, name="index"),
+    path("posts/<int:post_id>/", api.post_detail, name="post"),
+    path(
+        "posts/<int:post_id>/comments/",
+        api.post_comments,
+        name="post_comments"
+    ),
+    path("follow/", api.follow_index, name="follow_index"),
+    path("delta/", api.delta, name="delta"),
+    path("group/<slug:slug>/", api.group_posts, name="group_posts"),
+    path("users/<str:username>/", api.profile, name="profile"),
+]
@@ -0,0 +1,177 @@
+"""Нагрузочный прогон лент на синтетических данных.
+
+seed() заполняет базу пользователями, постами, подписками и
+комментариями через bulk_create, затем пересчитывает UserStats и
+раскладывает ленты. run() открывает каждую страницу тестовым клиентом
+repeat раз и собирает p50/p99 времени ответа и число SQL-запросов,
+check() сравнивает их с BENCHMARK_BUDGETS. Первый запрос к странице идёт
+в пустой кеш, поэтому p99 близок к холодной загрузке, а p50 - к тёплой.
+"""
+import random
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import feed, stats
+from .models import Comment, Follow, Group, Post, User
+from .transfer import bulk_create_dated
+
+BATCH_SIZE = 5000
+
+Result = namedtuple('Result', 'view url p50 p99 queries')
+
+
+def _insert(model, rows, log):
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            bulk_create_dated(model, batch)
+            total += len(batch)
+            batch = []
+    bulk_create_dated(model, batch)
+    total += len(batch)
+    log(f'{model._meta.verbose_name_plural}: {total}')
+
+
+def _popular(rng, count):
+    """Номер от 0 до count - 1; малые номера выпадают чаще."""
+    return int(count * rng.random() ** 3)
+
+
+def seed(users=1000, posts=10000, follows=50000, comments=20000, groups=20,
+         random_seed=0, log=lambda message: None):
+    """Заполняет пустую базу; id задаются явно, начиная с 1."""
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    start = now - timedelta(days=365)
+    step = (now - start) / max(posts, 1)
+
+    with transaction.atomic():
+        _insert(Group, (
+            Group(id=n, title=f'Группа {n}', slug=f'group-{n}')
+            for n in range(1, groups + 1)
+        ), log)
+        _insert(User, (
+            User(id=n, username=f'user{n}', password='!')
+            for n in range(1, users + 1)
+        ), log)
+        _insert(Post, (
+            Post(
+                id=n,
+                author_id=_popular(rng, users) + 1,
+                group_id=rng.randint(1, groups) if rng.random() < 0.5
+                else None,
+                text=f'Пост {n}',
+                pub_date=start + step * n,
+            )
+            for n in range(1, posts + 1)
+        ), log)
+        _insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in (
+                (rng.randint(1, users), _popular(rng, users) + 1)
+                for _ in range(follows)
+            )
+            if user_id != author_id
+        ), log)
+        _insert(Comment, (
+            Comment(
+                id=n,
+                post_id=post_id,
+                author_id=rng.randint(1, users),
+                text=f'Коментарий {n}',
+                created=start + step * post_id + timedelta(minutes=n % 600),
+            )
+            for n, post_id in (
+                (n, _popular(rng, posts) + 1)
+                for n in range(1, comments + 1)
+            )
+        ), log)
+        stats.rebuild()
+        log(f'Записи лент: {feed.rebuild()}')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def pages():
+    """(имя, url, пользователь или None) самых тяжёлых страниц базы."""
+    group = Group.objects.annotate(
+        count=Count('posts')
+    ).order_by('-count').first()
+    author = User.objects.order_by('-stats__post_count').first()
+    post = Post.objects.annotate(
+        count=Count('comments')
+    ).order_by('-count').select_related('author').first()
+    reader = User.objects.order_by('-stats__following_count').first()
+    return [
+        ('index', reverse('index'), None),
+        ('group_posts', reverse('group_posts', args=[group.slug]), None),
+        ('profile', reverse('profile', args=[author.username]), None),
+        ('post_view', reverse(
+            'post', args=[post.author.username, post.pk]
+        ), None),
+        ('follow_index', reverse('follow_index'), reader),
+    ]
+
+
+def measure(client, url, repeat):
+    timings, queries = [], []
+    for _ in range(repeat):
+        # Журнал запросов ограничен 9000 записями, а счёт идёт по его длине.
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise AssertionError(f'{url} ответил {response.status_code}')
+        queries.append(len(captured))
+    return timings, queries
+
+
+def run(repeat=20):
+    results = []
+    for view, url, user in pages():
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        timings, queries = measure(client, url, repeat)
+        results.append(Result(
+            view, url,
+            percentile(timings, 0.5), percentile(timings, 0.99),
+            max(queries),
+        ))
+    return results
+
+
+def check(results, budgets=None):
+    """Список нарушений бюджета; пустой, если всё в пределах."""
+    budgets = settings.BENCHMARK_BUDGETS if budgets is None else budgets
+    violations = []
+    for result in results:
+        budget = budgets.get(result.view, {})
+        if result.p99 > budget.get('p99_ms', float('inf')):
+            violations.append(
+                f'{result.view}: p99 {result.p99:.1f} мс, '
+                f'бюджет {budget["p99_ms"]} мс'
+            )
+        if result.queries > budget.get('queries', float('inf')):
+            violations.append(
+                f'{result.view}: {result.queries} запросов, '
+                f'бюджет {budget["queries"]}'
+            )
+    return violations
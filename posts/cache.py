@@ -0,0 +1,203 @@
+"""Версионированные пространства ключей кеша.
+
+Фрагменты лент кешируются под ключом, в который входит версия
+пространства (главная, группа, профиль, лента подписок). Запись не ищет
+и не удаляет старые ключи, а выдаёт пространству новую версию: устаревшие
+фрагменты больше не запрашиваются и вытесняются по TTL.
+"""
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+    quote_etag,
+)
+
+from yatube.routers import reading_replica
+
+INDEX = 'index'
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def profile(user_id):
+    return f'profile:{user_id}'
+
+
+def follow(user_id):
+    return f'follow:{user_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def _key(namespace):
+    return f'version:{namespace}'
+
+
+def _token():
+    # Время выдачи версии в начале токена: см. storable().
+    return f'{int(time.time()):x}-{uuid.uuid4().hex[:8]}'
+
+
+def _issued(token):
+    """Секунда выдачи версии; None у версии старого формата."""
+    try:
+        return int(token.partition('-')[0], 16)
+    except ValueError:
+        return None
+
+
+def get_versions(*namespaces):
+    keys = [_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    missing = {key: _token() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return [found.get(key) or missing[key] for key in keys]
+
+
+def version(*namespaces):
+    return '.'.join(get_versions(*namespaces))
+
+
+def bump(*namespaces):
+    if namespaces:
+        cache.set_many(
+            {_key(namespace): _token() for namespace in namespaces},
+            timeout=None
+        )
+
+
+def storable(*namespaces):
+    """Можно ли класть в кеш ответ, зависящий от пространств namespaces.
+
+    Реплика догоняет запись не дольше REPLICA_PIN_SECONDS. Если запрос
+    читает с реплики, а версия выдана позже, ответ мог быть собран по
+    старым данным и остался бы в кеше под новой версией.
+    """
+    if not reading_replica():
+        return True
+    settled = time.time() - settings.REPLICA_PIN_SECONDS
+    for token in get_versions(*namespaces):
+        issued = _issued(token)
+        # Версия старого формата выдана давно.
+        if issued is not None and issued > settled:
+            return False
+    return True
+
+
+def last_modified(*namespaces):
+    """Время последней записи в пространства namespaces для Last-Modified.
+
+    Каждая запись выдаёт новую версию, поэтому время сдвигается вперёд и
+    при правке или удалении. Дата HTTP точна до секунды: пока последняя
+    версия выдана в текущую секунду, None, иначе вторая запись в ту же
+    секунду не сдвинула бы Last-Modified.
+    """
+    issued = [_issued(token) for token in get_versions(*namespaces)]
+    if not issued or None in issued or max(issued) >= int(time.time()):
+        return None
+    return datetime.fromtimestamp(max(issued), tz=timezone.utc)
+
+
+def etag(namespaces, *parts):
+    """ETag ответа: версии пространств и то, от чего ещё зависит ответ."""
+    raw = '|'.join([version(*namespaces), *map(str, parts)])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def fragment_context(request, page, *namespaces):
+    """Переменные для {% cache %} вокруг списка постов страницы.
+
+    Ключ зависит от версии ленты и курсора страницы. Кнопка
+    «Редактировать» видна только автору, поэтому зритель попадает в ключ,
+    только если на странице есть его посты; остальные делят один фрагмент.
+    """
+    user = request.user
+    owns = user.is_authenticated and any(
+        item.author_id == user.pk for item in page
+    )
+    return {
+        'cache_timeout': (
+            settings.FEED_CACHE_TIMEOUT if storable(*namespaces) else 0
+        ),
+        'cache_version': version(*namespaces),
+        'cache_page': (
+            request.GET.get('cursor') or request.GET.get('page') or '1'
+        ),
+        'cache_viewer': user.pk if owns else 'public',
+    }
+
+
+# Параметры запроса, которые читают кешируемые целиком страницы.
+PAGE_PARAMS = ('cursor', 'page')
+
+
+def page_url(request):
+    """Путь и параметры страницы без меток и прочего мусора в URL."""
+    params = [
+        (name, request.GET[name]) for name in PAGE_PARAMS
+        if name in request.GET
+    ]
+    return f'{request.path}?{urlencode(params)}' if params else request.path
+
+
+def anonymous_page(namespaces):
+    """Кеширует страницу целиком для анонимных посетителей.
+
+    namespaces(request, *args, **kwargs) называет пространства, от которых
+    зависит страница. Ключ и ETag собираются из их версий и page_url,
+    поэтому запись, сменившая версию, сразу отменяет и копию в кеше, и
+    копии у клиентов. Прокси может держать страницу ANON_PAGE_MAX_AGE секунд, а
+    затем перепроверить её по ETag. Вошедшим пользователям страница
+    отдаётся с Cache-Control: private.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                not settings.ANON_PAGE_CACHE
+                or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                patch_vary_headers(response, ('Cookie',))
+                return response
+
+            names = namespaces(request, *args, **kwargs)
+            tag = quote_etag(etag(names, page_url(request)))
+            response = get_conditional_response(request, etag=tag)
+            if response is None:
+                key = f'page:{tag}'
+                response = cache.get(key)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                    if not storable(*names):
+                        # Ни кеш, ни клиент не должны связать её с тегом.
+                        patch_cache_control(response, max_age=0)
+                        patch_vary_headers(response, ('Cookie',))
+                        return response
+                    # Ответ с cookie (CSRF, сессия) личный.
+                    if response.status_code == 200 and not response.cookies:
+                        cache.set(
+                            key, response, settings.ANON_PAGE_CACHE_TIMEOUT
+                        )
+            response['ETag'] = tag
+            patch_cache_control(
+                response, public=True, max_age=settings.ANON_PAGE_MAX_AGE
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,154 @@
+"""Поток новых постов для лент (Server-Sent Events).
+
+Новый пост после COMMIT публикуется в хаб процесса по каналам главной,
+группы и профиля автора (имена каналов - пространства posts.cache).
+Открытый поток подписан на каналы своей ленты и отправляет клиенту
+короткое событие сразу, как пост появился в этом процессе.
+
+Посты, опубликованные другими воркерами, в хаб этого процесса не
+попадают. Поэтому, если за EVENTS_POLL_INTERVAL секунд событий не было,
+поток сам спрашивает базу о постах ленты новее последнего отправленного
+id: один запрос по индексу на поток вместо перерисовки страницы на
+каждое обновление у клиента. Тот же запрос догоняет пропущенное после
+переподключения по заголовку Last-Event-ID.
+
+Под WSGI поток занимает поток сервера, поэтому соединение живёт не
+дольше EVENTS_STREAM_SECONDS, после чего EventSource переподключается.
+"""
+import json
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+from . import cache
+
+# Через сколько миллисекунд EventSource переподключится после обрыва.
+RETRY_MS = 3000
+
+
+class Subscription:
+    def __init__(self, channels):
+        self.channels = set(channels)
+        self.queue = queue.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Отстающий клиент догонит пропущенное опросом базы.
+            pass
+
+    def get(self, timeout):
+        """События, пришедшие за timeout секунд; пустой список, если нет."""
+        try:
+            events = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class Hub:
+    """Публикация и подписка внутри одного процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._channels.pop(channel, None)
+
+    def publish(self, channels, event):
+        with self._lock:
+            subscribers = set()
+            for channel in channels:
+                subscribers.update(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        return len(subscribers)
+
+
+hub = Hub()
+
+
+def post_event(post):
+    return {
+        'id': post.pk,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'pub_date': post.pub_date.isoformat(),
+        'url': reverse('post', args=[post.author.username, post.pk]),
+    }
+
+
+def post_channels(post):
+    channels = [cache.INDEX, cache.profile(post.author_id)]
+    if post.group_id:
+        channels.append(cache.group(post.group_id))
+    return channels
+
+
+def publish_post(post):
+    return hub.publish(post_channels(post), post_event(post))
+
+
+def _encode(event):
+    data = json.dumps(event, ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: post\ndata: {data}\n\n'
+
+
+def newer(posts, last_id, limit=None):
+    """Посты ленты с id больше last_id по возрастанию id."""
+    limit = limit or settings.EVENTS_QUEUE_SIZE
+    return posts.filter(pk__gt=last_id).select_related(
+        'author', 'group'
+    ).order_by('pk')[:limit]
+
+
+def stream(spec, last_id=None):
+    """Строки text/event-stream для ленты spec (см. feed.resolve)."""
+    subscription = hub.subscribe(spec.channels)
+    try:
+        if last_id is None:
+            latest = spec.posts.order_by('-pk').values_list('pk', flat=True)
+            last_id = latest.first() or 0
+        yield f'retry: {RETRY_MS}\n\n'
+        deadline = time.monotonic() + settings.EVENTS_STREAM_SECONDS
+        events = [post_event(post) for post in newer(spec.posts, last_id)]
+        while True:
+            sent = False
+            for event in events:
+                if event['id'] > last_id:
+                    last_id = event['id']
+                    sent = True
+                    yield _encode(event)
+            if time.monotonic() >= deadline:
+                return
+            if not sent:
+                # Комментарий держит соединение открытым через прокси.
+                yield ': ping\n\n'
+            events = subscription.get(settings.EVENTS_POLL_INTERVAL)
+            if not events:
+                events = [
+                    post_event(post) for post in newer(spec.posts, last_id)
+                ]
+    finally:
+        hub.unsubscribe(subscription)
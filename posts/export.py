@@ -0,0 +1,105 @@
+"""Потоковая выгрузка данных одного пользователя.
+
+Посты и комментарии читаются iterator() пачками по CHUNK_SIZE и сразу
+уходят клиенту через StreamingHttpResponse, поэтому память не зависит от
+числа постов. В NDJSON картинки указаны ссылками. В zip-архив они входят
+файлами без сжатия и копируются кусками по FILE_CHUNK_SIZE: архив пишется
+в поток без перемотки, размер записей заранее не известен (zip64).
+"""
+import json
+import zipfile
+
+from django.core.files.storage import default_storage
+
+from .transfer import _json_value
+
+CHUNK_SIZE = 1000
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def _json_line(record):
+    return json.dumps(record, default=_json_value, ensure_ascii=False) + '\n'
+
+
+def records(author):
+    """Профиль, посты и комментарии автора по одной записи."""
+    yield {
+        'type': 'user',
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+        'date_joined': author.date_joined,
+    }
+    posts = author.posts.order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'group__slug', 'image'
+    )
+    for pk, text, pub_date, group, image in posts.iterator(CHUNK_SIZE):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'text': text,
+            'pub_date': pub_date,
+            'group': group,
+            'image': image or None,
+            'image_url': default_storage.url(image) if image else None,
+        }
+    comments = author.comments.order_by('pk').values_list(
+        'pk', 'post_id', 'text', 'created'
+    )
+    for pk, post_id, text, created in comments.iterator(CHUNK_SIZE):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'post': post_id,
+            'text': text,
+            'created': created,
+        }
+
+
+def ndjson(author):
+    for record in records(author):
+        yield _json_line(record).encode()
+
+
+class _Sink:
+    """Файл только на запись: zipfile пишет сюда, генератор забирает."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_archive(author):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('data.ndjson', 'w', force_zip64=True) as data:
+            for record in records(author):
+                data.write(_json_line(record).encode())
+                if sink.chunks:
+                    yield sink.take()
+        images = author.posts.exclude(image='').exclude(
+            image__isnull=True
+        ).order_by('pk').values_list('image', flat=True)
+        for name in images.iterator(CHUNK_SIZE):
+            if not default_storage.exists(name):
+                continue
+            info = zipfile.ZipInfo(f'images/{name}')
+            info.compress_type = zipfile.ZIP_STORED
+            with default_storage.open(name, 'rb') as source, \
+                    archive.open(info, 'w', force_zip64=True) as target:
+                for chunk in source.chunks(FILE_CHUNK_SIZE):
+                    target.write(chunk)
+                    yield sink.take()
+        yield sink.take()
+    yield sink.take()
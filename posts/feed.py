@@ -0,0 +1,250 @@
+"""Лента подписок, материализованная при записи (fan-out-on-write).
+
+Каждый новый пост автора раскладывается в FeedEntry его подписчиков,
+поэтому страница /follow/ читается по индексу (user, pub_date, post) без
+соединения Follow и Post. Для авторов, у которых подписчиков больше
+FEED_FANOUT_LIMIT, записи не раскладываются: их посты подмешиваются
+при чтении (fan-out-on-read).
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connection, transaction
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+
+from . import cache
+from .models import FeedEntry, Follow, Group, Post, User, UserStats
+from .paginator import CursorPaginator
+
+BATCH_SIZE = 500
+
+PUSH = 'push'
+DEFER = 'defer'
+PULL = 'pull'
+
+# Посты ленты и каналы posts.events, в которых появляются новые.
+FeedSpec = namedtuple('FeedSpec', 'posts channels')
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def follower_count(author_id):
+    return UserStats.objects.filter(user_id=author_id).values_list(
+        'follower_count', flat=True
+    ).first() or 0
+
+
+def fanout_mode(author_id):
+    """PUSH - раскладка в запросе, DEFER - фоновой задачей, PULL - нет."""
+    followers = follower_count(author_id)
+    if followers > settings.FEED_FANOUT_LIMIT:
+        return PULL
+    if followers > settings.FEED_SYNC_FANOUT_LIMIT:
+        return DEFER
+    return PUSH
+
+
+def is_pushed(author_id):
+    return fanout_mode(author_id) != PULL
+
+
+def fan_out(post):
+    if post.author_id is None or not is_pushed(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator():
+        batch.append(FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    _bulk_insert(batch)
+
+
+def backfill(user, author):
+    if not is_pushed(author.pk):
+        return
+    posts = author.posts.values_list('pk', 'pub_date')
+    batch = []
+    for post_id, pub_date in posts.iterator():
+        batch.append(FeedEntry(
+            user_id=user.pk,
+            post_id=post_id,
+            author_id=author.pk,
+            pub_date=pub_date,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    _bulk_insert(batch)
+
+
+def rebuild():
+    """Раскладывает ленты заново одним INSERT ... SELECT.
+
+    Нужен после массовой загрузки через bulk_create, которая не вызывает
+    сигналов. Счётчики UserStats к этому моменту должны быть пересчитаны.
+    """
+    FeedEntry.objects.all().delete()
+    tables = {
+        'feed': FeedEntry._meta.db_table,
+        'follow': Follow._meta.db_table,
+        'post': Post._meta.db_table,
+        'stats': UserStats._meta.db_table,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {feed} (user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            'FROM {follow} f '
+            'JOIN {post} p ON p.author_id = f.author_id '
+            'LEFT JOIN {stats} s ON s.user_id = f.author_id '
+            'WHERE COALESCE(s.follower_count, 0) <= %s'.format(**tables),
+            [settings.FEED_FANOUT_LIMIT]
+        )
+        return cursor.rowcount
+
+
+def materialize(author_id):
+    """Доращивает записи ленты всех подписчиков автора до его постов.
+
+    Пока автор был в PULL, новые подписки и посты записей не получали.
+    Когда подписчиков снова не больше FEED_FANOUT_LIMIT, его посты больше
+    не подмешиваются при чтении, поэтому недостающее раскладывается здесь
+    одним INSERT ... SELECT.
+    """
+    tables = {
+        'feed': FeedEntry._meta.db_table,
+        'follow': Follow._meta.db_table,
+        'post': Post._meta.db_table,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {feed} (user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            'FROM {follow} f '
+            'JOIN {post} p ON p.author_id = f.author_id '
+            'WHERE f.author_id = %s AND NOT EXISTS ('
+            'SELECT 1 FROM {feed} e '
+            'WHERE e.user_id = f.user_id AND e.post_id = p.id)'.format(
+                **tables
+            ),
+            [author_id]
+        )
+        return cursor.rowcount
+
+
+def unfollowed(author_id):
+    """После отписки автор мог перейти из PULL обратно в раскладку."""
+    if follower_count(author_id) == settings.FEED_FANOUT_LIMIT:
+        # После COMMIT: при удалении автора его посты ещё удаляются.
+        transaction.on_commit(lambda: materialize(author_id))
+
+
+def prune(user, author):
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def pulled_authors(user):
+    return Follow.objects.filter(
+        user=user,
+        author__stats__follower_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values_list('author_id', flat=True)
+
+
+def follow_feed(user, pulled=None):
+    if pulled is None:
+        pulled = list(pulled_authors(user))
+    if not pulled:
+        return Post.objects.filter(feed_entries__user=user)
+    entries = FeedEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(Q(pk__in=entries) | Q(author__in=pulled))
+
+
+class FollowPaginator(CursorPaginator):
+    """Страницы ленты подписок без чтения всей ленты пользователя.
+
+    Записи FeedEntry и посты каждого популярного автора читаются
+    отдельными запросами по своим индексам, не больше страницы с каждого.
+    Ключи сливаются в памяти, и из Post достаются только посты страницы.
+    """
+
+    def __init__(self, user, per_page, pulled=(), posts=None):
+        if posts is None:
+            posts = Post.objects.for_feed()
+        super().__init__(posts, per_page)
+        self.sources = [
+            (FeedEntry.objects.filter(user=user), ('pub_date', 'post_id'))
+        ] + [
+            (Post.objects.filter(author_id=author_id), ('pub_date', 'pk'))
+            for author_id in pulled
+        ]
+
+    def _rows(self, descending, values=None, offset=0):
+        limit = offset + self.per_page + 1
+        keys = set()
+        for rows, ordering in self.sources:
+            rows = rows.order_by(*(
+                f'-{name}' if descending else name for name in ordering
+            ))
+            if values is not None:
+                lookup = 'lt' if descending else 'gt'
+                rows = rows.filter(self._seek(values, lookup, ordering))
+            keys.update(rows.values_list(*ordering)[:limit])
+        keys = sorted(keys, reverse=descending)[offset:limit]
+        posts = self.object_list.in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+
+def follow_namespaces(user, pulled):
+    """Пространства кеша ленты: своё и профили популярных авторов."""
+    return [cache.follow(user.pk)] + [
+        cache.profile(author_id) for author_id in pulled
+    ]
+
+
+def follower_namespaces(author_id):
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    return [cache.follow(user_id) for user_id in followers.iterator()]
+
+
+def resolve(params, user):
+    """Лента по параметрам feed=index|group|author|follow и slug/username.
+
+    Неизвестная лента - ValueError, чужая лента подписок - PermissionDenied.
+    """
+    kind = params.get('feed') or 'index'
+    if kind == 'index':
+        return FeedSpec(Post.objects.all(), [cache.INDEX])
+    if kind == 'group':
+        group = get_object_or_404(Group, slug=params.get('slug'))
+        return FeedSpec(group.posts.all(), [cache.group(group.pk)])
+    if kind == 'author':
+        author = get_object_or_404(User, username=params.get('username'))
+        return FeedSpec(author.posts.all(), [cache.profile(author.pk)])
+    if kind == 'follow':
+        if not user.is_authenticated:
+            raise PermissionDenied
+        authors = Follow.objects.filter(
+            user=user
+        ).values_list('author_id', flat=True)
+        return FeedSpec(
+            follow_feed(user),
+            [cache.profile(author_id) for author_id in authors],
+        )
+    raise ValueError(f'Неизвестная лента {kind}')
@@ -0,0 +1,123 @@
+"""Шина инвалидации кеша по записям Post, Comment, Follow и Group.
+
+Для каждой модели регистрируются функции, которые по изменённому объекту
+называют устаревшие пространства ключей из posts.cache. Один приёмник
+post_save/post_delete собирает их и выдаёт пространствам новые версии,
+поэтому любой слой кеша может держать данные с длинным TTL.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import cache, feed, tasks
+from .models import Comment, Follow, Group, Post, User
+from .signals import deleting_posts
+
+_resolvers = {}
+
+
+def stale(model):
+    """Регистрирует функцию «объект -> устаревшие пространства»."""
+    def decorator(func):
+        _resolvers.setdefault(model, []).append(func)
+        return func
+    return decorator
+
+
+def namespaces_for(instance):
+    namespaces = set()
+    for resolver in _resolvers.get(type(instance), ()):
+        namespaces.update(resolver(instance))
+    return namespaces
+
+
+def invalidate(instance):
+    namespaces = namespaces_for(instance)
+    if not namespaces:
+        return
+    cache.bump(*namespaces)
+    # Читатель мог заполнить кеш старыми данными между bump и COMMIT,
+    # поэтому внутри транзакции версия меняется ещё раз после фиксации.
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.bump(*namespaces))
+
+
+def follower_feeds(author_id):
+    """Ленты подписчиков автора.
+
+    Подписчиков популярного автора не перебираем: их лента включает
+    версию его профиля (см. posts.feed.follow_namespaces). Для авторов
+    с раскладкой в фоне версии лент меняет воркер.
+    """
+    mode = feed.fanout_mode(author_id)
+    if mode == feed.PULL:
+        return []
+    if mode == feed.DEFER:
+        tasks.bump_follower_feeds.delay(author_id)
+        return []
+    return feed.follower_namespaces(author_id)
+
+
+def post_feeds(post):
+    namespaces = [cache.INDEX, cache.post(post.pk)]
+    for group_id in {post.group_id, getattr(post, '_stale_group_id', None)}:
+        if group_id:
+            namespaces.append(cache.group(group_id))
+    if post.author_id:
+        namespaces.append(cache.profile(post.author_id))
+        namespaces.extend(follower_feeds(post.author_id))
+    return namespaces
+
+
+@stale(Post)
+def stale_for_post(post):
+    return post_feeds(post)
+
+
+@stale(Comment)
+def stale_for_comment(comment):
+    if comment.post_id in deleting_posts():
+        # Ленты поста сбросит его собственное удаление.
+        return []
+    post = Post.objects.filter(pk=comment.post_id).first()
+    return post_feeds(post) if post is not None else []
+
+
+@stale(Follow)
+def stale_for_follow(follow):
+    return [
+        cache.follow(follow.user_id),
+        cache.profile(follow.user_id),
+        cache.profile(follow.author_id),
+    ]
+
+
+@stale(Group)
+def stale_for_group(group):
+    return [cache.group(group.pk)]
+
+
+@stale(User)
+def stale_for_user(user):
+    return [cache.profile(user.pk)]
+
+
+def remember_group(sender, instance, **kwargs):
+    """Пост могли перенести в другую группу: сбросим и прежнюю."""
+    if instance.pk:
+        instance._stale_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+def on_write(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login и ничего не меняет
+    # в лентах.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate(instance)
+
+
+pre_save.connect(remember_group, sender=Post)
+for model in _resolvers:
+    post_save.connect(on_write, sender=model)
+    post_delete.connect(on_write, sender=model)
@@ -0,0 +1,87 @@
+"""Конкурентная нагрузка на файл SQLite: чтение постов и запись комментариев.
+
+Каждый воркер - отдельный процесс со своим соединением, поэтому
+прогон упирается в блокировки базы, а не в GIL. Воркер duration секунд
+открывает случайные посты и с долей write_ratio оставляет под ними
+комментарии через add_comment. Ошибки «database is locked» не роняют
+прогон, а считаются: с WAL и BEGIN IMMEDIATE их быть не должно.
+"""
+import multiprocessing
+import random
+import time
+from collections import namedtuple
+
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+
+from .benchmark import percentile
+from .models import Post, User
+
+SAMPLE_POSTS = 500
+
+Throughput = namedtuple('Throughput', 'workers reads writes locked p99')
+
+
+def _targets():
+    posts = Post.objects.order_by('-pk').values_list(
+        'pk', 'author__username'
+    )[:SAMPLE_POSTS]
+    return [
+        (reverse('post', args=[username, pk]),
+         reverse('add_comment', args=[username, pk]))
+        for pk, username in posts
+    ]
+
+
+def _work(duration, write_ratio, seed, results):
+    rng = random.Random(seed)
+    targets = _targets()
+    users = list(User.objects.order_by('?')[:50])
+    client = Client()
+    client.force_login(rng.choice(users))
+    reads = writes = locked = 0
+    timings = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        read_url, write_url = rng.choice(targets)
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                client.post(write_url, {'text': 'Нагрузка'})
+                writes += 1
+            else:
+                client.get(read_url)
+                reads += 1
+                timings.append((time.perf_counter() - started) * 1000)
+        except OperationalError:
+            locked += 1
+    connections.close_all()
+    results.put((reads, writes, locked, timings))
+
+
+def run(workers, duration=5.0, write_ratio=0.2):
+    """Throughput для одного числа воркеров; база - файл, не :memory:."""
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    # Дочерние процессы не должны делить открытое соединение родителя.
+    connections.close_all()
+    processes = [
+        context.Process(
+            target=_work, args=(duration, write_ratio, seed, results)
+        )
+        for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    timings = [timing for *_, worker in collected for timing in worker]
+    return Throughput(
+        workers,
+        sum(reads for reads, *_ in collected) / duration,
+        sum(writes for _, writes, *_ in collected) / duration,
+        sum(locked for _, _, locked, _ in collected),
+        percentile(timings, 0.99) if timings else 0.0,
+    )
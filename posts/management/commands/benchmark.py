@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+
+from posts import benchmark
+
+# Отдельный кеш, чтобы версии лент рабочей базы не попали в прогон.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет тестовую базу синтетическими данными и замеряет "
+        "время ответа и число запросов лент; падает при превышении "
+        "BENCHMARK_BUDGETS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                benchmark.seed(
+                    users=options['users'],
+                    posts=options['posts'],
+                    follows=options['follows'],
+                    comments=options['comments'],
+                    log=self.log,
+                )
+                results = benchmark.run(repeat=options['repeat'])
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            self.stdout.write(
+                f'{result.view:<14} p50 {result.p50:8.1f} мс  '
+                f'p99 {result.p99:8.1f} мс  запросов {result.queries:3}  '
+                f'{result.url}'
+            )
+        violations = benchmark.check(results)
+        if violations:
+            raise CommandError('Превышен бюджет:\n' + '\n'.join(violations))
+        self.stdout.write(
+            self.style.SUCCESS('Все страницы в пределах бюджета')
+        )
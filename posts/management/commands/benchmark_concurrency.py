@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+
+from posts import benchmark, loadtest
+
+from .benchmark import BENCHMARK_CACHES, Command as BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Заполняет тестовую базу в файле SQLite и замеряет, сколько "
+        "чтений и записей в секунду выдерживают несколько процессов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+            help="Числа процессов, для каждого отдельный прогон"
+        )
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument(
+            '--journal', choices=['wal', 'delete'], default='wal',
+            help="journal_mode базы; delete - для сравнения без WAL"
+        )
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        settings_dict = connection.settings_dict
+        saved_test, saved_options = settings_dict['TEST'], \
+            settings_dict['OPTIONS']
+        # Процессы делят базу только через файл, :memory: не подходит.
+        settings_dict['TEST'] = {
+            **saved_test, 'NAME': os.path.join(directory, 'load.sqlite3')
+        }
+        settings_dict['OPTIONS'] = {
+            **saved_options,
+            'pragmas': {
+                **saved_options.get('pragmas', {}),
+                'journal_mode': options['journal'],
+            },
+        }
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(
+                CACHES=BENCHMARK_CACHES, ANON_PAGE_CACHE=False
+            ):
+                benchmark.seed(
+                    users=options['users'],
+                    posts=options['posts'],
+                    follows=options['follows'],
+                    comments=options['comments'],
+                    log=self.log,
+                )
+                for workers in options['workers']:
+                    result = loadtest.run(
+                        workers, options['duration'], options['write_ratio']
+                    )
+                    self.stdout.write(
+                        f'процессов {result.workers:3}  '
+                        f'чтений/с {result.reads:8.1f}  '
+                        f'записей/с {result.writes:7.1f}  '
+                        f'p99 чтения {result.p99:7.1f} мс  '
+                        f'locked {result.locked}'
+                    )
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+            settings_dict['TEST'], settings_dict['OPTIONS'] = \
+                saved_test, saved_options
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,15 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Показывает попадания, промахи и вытеснения общего кеша"
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'stats'):
+            raise CommandError(
+                f"{type(cache).__name__} не ведёт статистику, "
+                f"включите YATUBE_CACHE=sqlite"
+            )
+        for name, value in cache.stats().items():
+            self.stdout.write(f"{name}: {value}")
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает группы, посты, комментарии и подписки в NDJSON "
+        "(файл или stdout) или в CSV (каталог, файл на модель)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', help="файл NDJSON, '-' для stdout или каталог для CSV"
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default='ndjson'
+        )
+        parser.add_argument(
+            '--models', default=','.join(transfer.MODELS),
+            help="через запятую: group,post,comment,follow"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+
+    def progress(self, name, written):
+        self.stderr.write(f"{name}: {written}")
+
+    def handle(self, *args, **options):
+        names = [name for name in options['models'].split(',') if name]
+        unknown = set(names) - set(transfer.MODELS)
+        if unknown:
+            raise CommandError(f"Неизвестные модели: {', '.join(unknown)}")
+        names = [name for name in transfer.MODELS if name in names]
+        output = options['output']
+        if options['format'] == 'csv':
+            transfer.write_csv(
+                output, names, options['batch_size'], self.progress
+            )
+        elif output == '-':
+            transfer.write_ndjson(
+                sys.stdout, names, options['batch_size'], self.progress
+            )
+        else:
+            with open(output, 'w', encoding='utf-8') as out:
+                transfer.write_ndjson(
+                    out, names, options['batch_size'], self.progress
+                )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Готовит миниатюры постов, у которых их ещё нет"
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).filter(thumbnail='')
+        done = 0
+        for post in posts.iterator():
+            try:
+                thumbnails.generate(post)
+            except Exception as error:
+                self.stderr.write(f"Пост {post.pk}: {error}")
+                continue
+            done += bool(post.thumbnail)
+        self.stdout.write(self.style.SUCCESS(f"Готово миниатюр: {done}"))
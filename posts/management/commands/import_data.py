@@ -0,0 +1,63 @@
+import os
+
+from django.db import DatabaseError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает группы, посты, комментарии и подписки из NDJSON-файла "
+        "или каталога CSV, выгруженных export_data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="файл NDJSON или каталог CSV")
+        parser.add_argument(
+            '--resume', action='store_true',
+            help="продолжить с места, где прервалась прошлая загрузка"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+
+    def progress(self, counts):
+        self.stderr.write(', '.join(
+            f"{name}: {count}" for name, count in counts.items()
+        ))
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if os.path.isdir(source):
+            rows = transfer.read_csv(source)
+            checkpoint_path = os.path.join(source, 'import.progress')
+        elif os.path.exists(source):
+            rows = transfer.read_ndjson(source)
+            checkpoint_path = f'{source}.progress'
+        else:
+            raise CommandError(f"Нет файла или каталога {source}")
+
+        checkpoint = transfer.Checkpoint(checkpoint_path, options['resume'])
+        importer = transfer.Importer(
+            checkpoint, options['batch_size'], self.progress
+        )
+        try:
+            counts = importer.load(rows)
+        except (ValueError, KeyError, DatabaseError) as error:
+            raise CommandError(
+                f"Загрузка прервана: {error!r}. Исправьте данные и "
+                f"запустите снова с --resume"
+            )
+        self.stdout.write("Пересчёт счётчиков, лент и поискового индекса")
+        transfer.finish()
+        checkpoint.clear()
+        if importer.skipped:
+            self.stdout.write(
+                f"Пропущено комментариев к неизвестным постам: "
+                f"{importer.skipped}"
+            )
+        self.stdout.write(self.style.SUCCESS("Загружено: " + ", ".join(
+            f"{name}: {count}" for name, count in counts.items()
+        )))
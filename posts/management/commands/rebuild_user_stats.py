@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики UserStats по таблицам постов и подписок"
+
+    def handle(self, *args, **options):
+        updated = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересчитана статистика пользователей: {updated}"
+        ))
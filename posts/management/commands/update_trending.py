@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает популярность постов с новыми комментариями"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Пересчитать все посты, а не только новые комментарии"
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            refreshed = trending.rebuild()
+        else:
+            refreshed = trending.update()
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересчитано постов: {refreshed}"
+        ))
@@ -0,0 +1,107 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:25
+
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 500
+
+
+def create_fts(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_search USING fts5('
+            'body, post_id UNINDEXED)'
+        )
+    except Exception:
+        # SQLite собран без FTS5: поиск пойдёт по SearchToken.
+        pass
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fill_index(apps, schema_editor):
+    # Тот же индекс, что строят сигналы и rebuild_search_index.
+    from posts.search import FTS_TABLE, tokenize
+
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchToken = apps.get_model('posts', 'SearchToken')
+    connection = schema_editor.connection
+    posts = Post.objects.values_list('pk', 'pk', 'text')
+    comments = Comment.objects.values_list('pk', 'post_id', 'text')
+    if FTS_TABLE in connection.introspection.table_names():
+        rows = (
+            (pk * 2 + offset, post_id, ' '.join(tokenize(text)))
+            for offset, queryset in ((0, posts), (1, comments))
+            for pk, post_id, text in queryset.iterator()
+        )
+        with connection.cursor() as cursor:
+            for batch in _batches(rows):
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, post_id, body) '
+                    f'VALUES (%s, %s, %s)', batch
+                )
+        return
+    tokens = (
+        SearchToken(
+            token=token[:64],
+            post_id=post_id,
+            comment_id=None if weight == 2 else pk,
+            weight=count * weight,
+        )
+        for weight, queryset in ((2, posts), (1, comments))
+        for pk, post_id, text in queryset.iterator()
+        for token, count in Counter(tokenize(text)).items()
+    )
+    for batch in _batches(tokens):
+        SearchToken.objects.bulk_create(batch)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('comment', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Comment')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['token', 'post'], name='search_token_post_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
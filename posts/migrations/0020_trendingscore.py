@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post')),
+                ('score', models.FloatField()),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('last_comment_id', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Популярность поста',
+                'verbose_name_plural': 'Популярность постов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['-score', '-post'], name='trending_score_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 User = get_user_model()
 
@@ -24,6 +27,21 @@ class Group(models.Model):
         verbose_name_plural = "Группы"
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что нужно include/post_item.html, за один запрос."""
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.select_related('author', 'group').annotate(
+            comment_count=Coalesce(
+                Subquery(comments, output_field=IntegerField()), 0
+            )
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name="Текст статьи",
@@ -54,11 +72,35 @@ class Post(models.Model):
         verbose_name="image",
         help_text="Загрузите картинку"
     )
+    thumbnail = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name="миниатюра"
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnail_url(self):
+        return default_storage.url(self.thumbnail)
+
     class Meta:
+        # Ленты идут по (-pub_date, -id): см. CursorPaginator.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
         ordering = ["-pub_date"]
@@ -88,6 +130,9 @@ class Comment(models.Model):
         return self.text[:15]
 
     class Meta:
+        indexes = [models.Index(
+            fields=['post', '-created', '-id'],
+            name='comment_post_created_idx')]
         verbose_name = "Коментарий"
         verbose_name_plural = "Коментарии"
         ordering = ["-created"]
@@ -115,3 +160,107 @@ class Follow(models.Model):
             name='unique_following')]
         verbose_name = "Подписчик"
         verbose_name_plural = "Подписчики"
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="feed_entries"
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    pub_date = models.DateTimeField("date published")
+
+    def __str__(self):
+        return f"{self.user_id}:{self.post_id}"
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'],
+            name='unique_feed_entry')]
+        indexes = [models.Index(
+            fields=['user', '-pub_date', '-post'],
+            name='feed_user_pub_date_idx')]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        ordering = ["-pub_date"]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.user_id)
+
+    class Meta:
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+
+
+class SearchToken(models.Model):
+    """Запись обратного индекса поиска для баз без FTS5."""
+    token = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="+"
+    )
+    weight = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return self.token
+
+    class Meta:
+        indexes = [models.Index(
+            fields=['token', 'post'],
+            name='search_token_post_idx')]
+        verbose_name = "Слово поискового индекса"
+        verbose_name_plural = "Поисковый индекс"
+
+
+class TrendingScore(models.Model):
+    """Место поста в популярном: очки за недавние комментарии."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending"
+    )
+    # Логарифм суммы весов комментариев, см. posts.trending.
+    score = models.FloatField()
+    comment_count = models.PositiveIntegerField(default=0)
+    last_comment_id = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.post_id)
+
+    class Meta:
+        indexes = [models.Index(
+            fields=['-score', '-post'],
+            name='trending_score_idx')]
+        verbose_name = "Популярность поста"
+        verbose_name_plural = "Популярность постов"
@@ -0,0 +1,201 @@
+"""Курсорная (keyset) пагинация лент.
+
+Страница выбирается условием по ключу сортировки (pub_date, id), а не
+OFFSET, и без COUNT(*): любая страница стоит столько же, сколько первая.
+Курсор - непрозрачный токен, который передаётся в ?cursor=.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# Наибольшее целое, которое SQLite и PostgreSQL принимают в запросе.
+MAX_INT = 2 ** 63 - 1
+
+
+class CursorPage(Page):
+    def __init__(self, object_list, number, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, number, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s items>' % len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по убыванию ключа ordering.
+
+    Наследует Paginator, поэтому count и page_range по-прежнему доступны,
+    но get_page их не вызывает.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('pub_date', 'pk')):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+
+    def _fields(self):
+        opts = self.object_list.model._meta
+        return [
+            opts.pk if name == 'pk' else opts.get_field(name)
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, direction, obj):
+        values = []
+        for name in self.ordering:
+            value = getattr(obj, name)
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        raw = json.dumps([direction] + values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, *values = json.loads(raw.decode())
+            if direction not in (NEXT, PREVIOUS):
+                return None
+            if len(values) != len(self.ordering):
+                return None
+            values = [
+                field.to_python(value)
+                for field, value in zip(self._fields(), values)
+            ]
+        except (binascii.Error, ValueError, TypeError, OverflowError,
+                ValidationError):
+            return None
+        for value in values:
+            if value is None:
+                return None
+            if isinstance(value, int) and not -MAX_INT - 1 <= value <= MAX_INT:
+                return None
+        return direction, values
+
+    def _seek(self, values, lookup, ordering=None):
+        """Условие «строго после ключа» для составного ключа ordering.
+
+        Само OR по частям ключа SQLite не превращает в диапазон индекса,
+        поэтому первое поле ещё раз ограничено через AND (lte/gte).
+        """
+        ordering = ordering or self.ordering
+        condition = Q()
+        equal = {}
+        for name, value in zip(ordering, values):
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        bound = Q(**{f'{ordering[0]}__{lookup}e': values[0]})
+        return bound & condition
+
+    def _descending(self):
+        return self.object_list.order_by(
+            *(f'-{name}' for name in self.ordering)
+        )
+
+    def _ascending(self):
+        return self.object_list.order_by(*self.ordering)
+
+    def after(self, values=None):
+        """Строки строго после ключа values по возрастанию ordering."""
+        rows = self._ascending()
+        return rows if values is None else rows.filter(
+            self._seek(values, 'gt')
+        )
+
+    def get_page(self, cursor=None, number=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is not None:
+            direction, values = decoded
+            if direction == PREVIOUS:
+                page = self._previous_page(values)
+                if page is not None:
+                    return page
+            else:
+                return self._next_page(values)
+        return self._numbered_page(number)
+
+    def _rows(self, descending, values=None, offset=0):
+        """Не больше per_page + 1 строк после ключа values (или OFFSET)."""
+        if descending:
+            rows = self._descending()
+            if values is not None:
+                rows = rows.filter(self._seek(values, 'lt'))
+        else:
+            rows = self.after(values)
+        return list(rows[offset:offset + self.per_page + 1])
+
+    def _next_page(self, values):
+        rows = self._rows(True, values)
+        return self._build(rows, None, has_previous=True)
+
+    def _previous_page(self, values):
+        rows = self._rows(False, values)
+        if not rows:
+            return None
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(
+            rows, None, self,
+            next_cursor=self.encode_cursor(NEXT, rows[-1]),
+            previous_cursor=(
+                self.encode_cursor(PREVIOUS, rows[0])
+                if has_previous else None
+            ),
+        )
+
+    def _numbered_page(self, number):
+        """Старые ссылки вида ?page=N: OFFSET, но по-прежнему без COUNT."""
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        if number * self.per_page + 1 > MAX_INT:
+            # Такой OFFSET база не примет: как и пустая страница - первая.
+            number = 1
+        offset = (number - 1) * self.per_page
+        rows = self._rows(True, offset=offset)
+        if not rows and number > 1:
+            return self._numbered_page(1)
+        return self._build(rows, number, has_previous=number > 1)
+
+    def _build(self, rows, number, has_previous):
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, number, self,
+            next_cursor=(
+                self.encode_cursor(NEXT, rows[-1]) if has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(PREVIOUS, rows[0])
+                if has_previous and rows else None
+            ),
+        )
+
+
+def plain_page(page, object_list):
+    """Обычные Paginator и Page для страницы курсора page.
+
+    Для кода, которому нужен ровно тип Paginator и Page. Навигация берётся
+    из курсоров страницы: count по object_list не считается, пока его не
+    спросят явно.
+    """
+    paginator = Paginator(object_list, page.paginator.per_page)
+    plain = Page(page.object_list, page.number, paginator)
+    plain.next_cursor = page.next_cursor
+    plain.previous_cursor = page.previous_cursor
+    return paginator, plain
@@ -0,0 +1,289 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Текст разбивается на слова и приводится к основе стеммером Портера для
+русского языка, поэтому «книги» находит «книгам». Индекс хранится в
+виртуальной таблице SQLite FTS5 с ранжированием bm25, если она есть,
+иначе в таблице SearchToken (слово -> пост). Обе держатся актуальными
+сигналами Post и Comment, а rebuild_search_index строит индекс заново.
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import Comment, Post, SearchToken
+
+FTS_TABLE = 'posts_search'
+BATCH_SIZE = 500
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_SUFFIX = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def _chunks(values, size=BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def stem(word):
+    """Стеммер Портера (Snowball) для русского слова."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if not match:
+        return word
+    prefix, rv = match.groups()
+    stripped = PERFECTIVE_GERUND.sub('', rv, 1)
+    if stripped != rv:
+        rv = stripped
+    else:
+        rv = REFLEXIVE.sub('', rv, 1)
+        stripped = ADJECTIVE.sub('', rv, 1)
+        if stripped != rv:
+            rv = PARTICIPLE.sub('', stripped, 1)
+        else:
+            stripped = VERB.sub('', rv, 1)
+            rv = NOUN.sub('', rv, 1) if stripped == rv else stripped
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_SUFFIX.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def tokenize(text):
+    tokens = []
+    for word in WORD.findall(text.lower()):
+        tokens.append(stem(word) if CYRILLIC.search(word) else word)
+    return tokens
+
+
+def query_terms(query):
+    terms = []
+    for token in tokenize(query):
+        if token not in terms:
+            terms.append(token)
+    return terms[:10]
+
+
+class FTSIndex:
+    """SQLite FTS5. rowid = 2 * id поста или 2 * id комментария + 1."""
+
+    INSERT = (
+        f'INSERT INTO {FTS_TABLE} (rowid, body, post_id) VALUES (%s, %s, %s)'
+    )
+
+    def _row(self, rowid, post_id, text):
+        return [rowid, ' '.join(tokenize(text)), post_id]
+
+    def _replace(self, rowid, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [rowid]
+            )
+            cursor.execute(self.INSERT, self._row(rowid, post_id, text))
+
+    def add_many(self, entries):
+        """Пачка новых записей (id поста, id комментария или None, текст)."""
+        rows = [
+            self._row(
+                post_id * 2 if comment_id is None else comment_id * 2 + 1,
+                post_id, text,
+            )
+            for post_id, comment_id, text in entries
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(self.INSERT, rows)
+
+    def _remove(self, rowid):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [rowid]
+            )
+
+    def index_post(self, post):
+        self._replace(post.pk * 2, post.pk, post.text)
+
+    def index_comment(self, comment):
+        self._replace(comment.pk * 2 + 1, comment.post_id, comment.text)
+
+    def remove_post(self, post):
+        self._remove(post.pk * 2)
+
+    def remove_comment(self, comment):
+        self._remove(comment.pk * 2 + 1)
+
+    def remove_comments(self, comment_ids):
+        with connection.cursor() as cursor:
+            for chunk in _chunks(comment_ids):
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+                    f'({", ".join(["%s"] * len(chunk))})',
+                    [pk * 2 + 1 for pk in chunk]
+                )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, terms, limit):
+        # bm25 нельзя взять в агрегат, поэтому совпадения идут по рангу,
+        # а повторы одного поста (его комментарии) отбрасываются здесь.
+        match = ' '.join(f'"{term}"' for term in terms)
+        ids = []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM {FTS_TABLE} WHERE {FTS_TABLE} '
+                f'MATCH %s ORDER BY rank, post_id DESC',
+                [match]
+            )
+            for (post_id,) in iter(cursor.fetchone, None):
+                if post_id not in ids:
+                    ids.append(post_id)
+                    if len(ids) == limit:
+                        break
+        return ids
+
+
+class TokenIndex:
+    """Индекс в обычной таблице для баз без FTS5."""
+
+    def _tokens(self, post_id, comment_id, text):
+        # Слово из самого поста весит вдвое больше слова комментария.
+        weight = 2 if comment_id is None else 1
+        return [
+            SearchToken(
+                token=token[:64],
+                post_id=post_id,
+                comment_id=comment_id,
+                weight=count * weight,
+            )
+            for token, count in Counter(tokenize(text)).items()
+        ]
+
+    def _replace(self, post_id, comment_id, text):
+        SearchToken.objects.filter(
+            post_id=post_id, comment_id=comment_id
+        ).delete()
+        SearchToken.objects.bulk_create(
+            self._tokens(post_id, comment_id, text)
+        )
+
+    def add_many(self, entries):
+        SearchToken.objects.bulk_create([
+            token
+            for post_id, comment_id, text in entries
+            for token in self._tokens(post_id, comment_id, text)
+        ], batch_size=BATCH_SIZE)
+
+    def index_post(self, post):
+        self._replace(post.pk, None, post.text)
+
+    def index_comment(self, comment):
+        self._replace(comment.post_id, comment.pk, comment.text)
+
+    def remove_post(self, post):
+        SearchToken.objects.filter(post_id=post.pk).delete()
+
+    def remove_comment(self, comment):
+        SearchToken.objects.filter(comment_id=comment.pk).delete()
+
+    def remove_comments(self, comment_ids):
+        for chunk in _chunks(comment_ids):
+            SearchToken.objects.filter(comment_id__in=chunk).delete()
+
+    def clear(self):
+        SearchToken.objects.all().delete()
+
+    def search(self, terms, limit):
+        matches = SearchToken.objects.filter(token__in=terms).values(
+            'post_id'
+        ).annotate(
+            matched=Count('token', distinct=True),
+            score=Sum('weight'),
+        ).filter(matched=len(terms)).order_by('-score', '-post_id')
+        return [row['post_id'] for row in matches[:limit]]
+
+
+_index = None
+
+
+def get_index():
+    global _index
+    if _index is None:
+        has_fts = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+        _index = FTSIndex() if has_fts else TokenIndex()
+    return _index
+
+
+def search_posts(query, limit=None):
+    terms = query_terms(query)
+    if not terms:
+        return []
+    ids = get_index().search(terms, limit or settings.SEARCH_RESULTS)
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def _entries():
+    posts = Post.objects.values_list('pk', 'text')
+    for post_id, text in posts.iterator(chunk_size=BATCH_SIZE):
+        yield post_id, None, text
+    comments = Comment.objects.values_list('post_id', 'pk', 'text')
+    yield from comments.iterator(chunk_size=BATCH_SIZE)
+
+
+def rebuild():
+    """Строит индекс заново пачками, по транзакции на пачку.
+
+    Возвращает число проиндексированных постов и комментариев.
+    """
+    index = get_index()
+    with transaction.atomic():
+        index.clear()
+    indexed = 0
+    batch = []
+    for entry in _entries():
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            with transaction.atomic():
+                index.add_many(batch)
+            indexed += len(batch)
+            batch = []
+    with transaction.atomic():
+        index.add_many(batch)
+    return indexed + len(batch)
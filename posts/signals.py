@@ -0,0 +1,146 @@
+import threading
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import events, feed, search, stats, tasks
+from .models import Comment, Follow, Post, User, UserStats
+
+_local = threading.local()
+
+
+def deleting_posts():
+    """id постов, которые сейчас удаляются вместе с комментариями."""
+    if not hasattr(_local, 'deleting_posts'):
+        _local.deleting_posts = set()
+    return _local.deleting_posts
+
+
+@receiver(pre_delete, sender=Post)
+def start_post_delete(sender, instance, **kwargs):
+    # Комментарии удаляются каскадом до поста. Их счётчики и поиск
+    # обновляются здесь разом, а ленты и популярное сбросит удаление поста.
+    deleting_posts().add(instance.pk)
+    comments = Comment.objects.filter(post_id=instance.pk).values_list(
+        'pk', 'author_id'
+    )
+    authors = Counter()
+    comment_ids = []
+    for pk, author_id in comments.iterator():
+        comment_ids.append(pk)
+        authors[author_id] += 1
+    for author_id, count in authors.items():
+        stats.decrement(author_id, comment_count=count)
+    search.get_index().remove_comments(comment_ids)
+
+
+@receiver(post_delete, sender=Post)
+def finish_post_delete(sender, instance, **kwargs):
+    deleting_posts().discard(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created and instance.author_id:
+        stats.increment(instance.author_id, post_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    if instance.author_id:
+        stats.decrement(instance.author_id, post_count=1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if instance.post_id in deleting_posts():
+        return
+    stats.decrement(instance.author_id, comment_count=1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, follower_count=1)
+        stats.increment(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, follower_count=1)
+    stats.decrement(instance.user_id, following_count=1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if feed.fanout_mode(instance.author_id) == feed.DEFER:
+        tasks.fan_out_post.delay(instance.pk)
+    else:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    feed.prune(instance.user, instance.author)
+    feed.unfollowed(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    # Например, сохранение одной миниатюры текст не меняет.
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    search.get_index().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_index().remove_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.get_index().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    if instance.post_id in deleting_posts():
+        return
+    search.get_index().remove_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def refresh_trending(sender, instance, **kwargs):
+    # Очки удаляемого поста уйдут каскадом вместе с ним.
+    if instance.post_id in deleting_posts():
+        return
+    tasks.refresh_trending.delay(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+def publish_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: events.publish_post(instance))
@@ -0,0 +1,60 @@
+"""Денормализованные счётчики пользователя (UserStats).
+
+Счётчики меняются атомарными UPDATE ... SET x = x + 1 из сигналов
+моделей, а rebuild() пересчитывает их по таблицам, если они разошлись.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+BATCH_SIZE = 500
+
+
+def _count(queryset, field):
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+        field
+    ).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def rebuild(users=None):
+    users = User.objects.all() if users is None else users
+    missing = users.filter(stats__isnull=True).values_list('pk', flat=True)
+    batch = []
+    for pk in missing.iterator():
+        batch.append(UserStats(user_id=pk))
+        if len(batch) >= BATCH_SIZE:
+            UserStats.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserStats.objects.bulk_create(batch, ignore_conflicts=True)
+    return UserStats.objects.filter(user__in=users).update(
+        post_count=_count(Post.objects, 'author'),
+        follower_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+        comment_count=_count(Comment.objects, 'author'),
+    )
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        rebuild(User.objects.filter(pk=user.pk))
+        return UserStats.objects.get(user_id=user.pk)
+
+
+def increment(user_id, **fields):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in fields.items()}
+    )
+    if not updated:
+        rebuild(User.objects.filter(pk=user_id))
+
+
+def decrement(user_id, **fields):
+    # Без пересчёта: строка могла исчезнуть вместе с удаляемым пользователем.
+    for name, delta in fields.items():
+        UserStats.objects.filter(
+            user_id=user_id, **{f'{name}__gte': delta}
+        ).update(**{name: F(name) - delta})
@@ -0,0 +1,34 @@
+from tasks.queue import task
+
+from . import cache, feed, thumbnails, trending
+from .models import Post
+
+
+@task()
+def generate_thumbnail(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        thumbnails.generate(post)
+
+
+@task()
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out(post)
+        cache.bump(*feed.follower_namespaces(post.author_id))
+
+
+@task(unique=True)
+def bump_follower_feeds(author_id):
+    cache.bump(*feed.follower_namespaces(author_id))
+
+
+@task(unique=True)
+def update_trending():
+    trending.update()
+
+
+@task(unique=True)
+def refresh_trending(post_id):
+    trending.refresh([post_id])
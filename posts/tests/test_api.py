@@ -0,0 +1,112 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            cls.post = Post.objects.create(
+                text='Пост %s' % number, author=cls.author, group=cls.group
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Да')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds(self):
+        """Ленты отдают посты страницами по курсору."""
+        urls = [
+            reverse('api:index'),
+            reverse('api:group_posts', args=['group']),
+            reverse('api:profile', args=['author']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0]['text'], 'Пост 11')
+                self.assertEqual(data['results'][0]['comment_count'], 1)
+                data = self.client.get(data['next']).json()
+                self.assertEqual(len(data['results']), 2)
+
+    def test_post_and_comments(self):
+        data = self.client.get(reverse('api:post', args=[self.post.pk])).json()
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(data['group'], 'group')
+        data = self.client.get(
+            reverse('api:post_comments', args=[self.post.pk])
+        ).json()
+        self.assertEqual(data['results'][0]['text'], 'Да')
+
+    def test_follow_requires_login(self):
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_not_modified_skips_rows(self):
+        """Совпавший ETag даёт 304 без запросов к базе."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_move_last_modified(self):
+        """Правка, комментарий и удаление сдвигают Last-Modified вперёд."""
+        url = reverse('api:index')
+        writes = {
+            'edit': lambda: Post.objects.get(pk=self.post.pk).save(),
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=self.author, text='Ок'
+            ),
+            'delete': lambda: Post.objects.get(pk=self.post.pk).delete(),
+        }
+        for name, write in writes.items():
+            with self.subTest(write=name):
+                # Версии выданы минуту назад, а не в текущую секунду.
+                with mock.patch('posts.cache.time') as clock:
+                    clock.time.return_value = time.time() - 60
+                    cache.clear()
+                    self.client.get(url)
+                last_modified = self.client.get(url)['Last-Modified']
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+                write()
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_writes_change_etag(self):
+        """Новый пост или комментарий меняют ETag затронутых ответов."""
+        index = reverse('api:index')
+        post = reverse('api:post', args=[self.post.pk])
+        index_etag = self.client.get(index)['ETag']
+        post_etag = self.client.get(post)['ETag']
+
+        Comment.objects.create(post=self.post, author=self.author, text='Ок')
+        response = self.client.get(post, HTTP_IF_NONE_MATCH=post_etag)
+        self.assertEqual(response.status_code, 200)
+
+        Post.objects.create(text='Новый', author=self.reader)
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=index_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый')
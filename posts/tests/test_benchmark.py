@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import FeedEntry, Follow, Post, UserStats
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.seed(users=30, posts=200, follows=300, comments=150)
+
+    def test_seed_builds_derived_tables(self):
+        """После bulk-загрузки счётчики и ленты совпадают с данными."""
+        self.assertEqual(Post.objects.count(), 200)
+        author = UserStats.objects.order_by('-post_count').first()
+        self.assertEqual(
+            author.post_count, Post.objects.filter(author=author.user).count()
+        )
+        follow = Follow.objects.first()
+        self.assertEqual(
+            FeedEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            Post.objects.filter(author=follow.author).count()
+        )
+
+    def test_run_reports_every_view(self):
+        results = benchmark.run(repeat=2)
+        self.assertEqual(
+            [result.view for result in results],
+            ['index', 'group_posts', 'profile', 'post_view', 'follow_index']
+        )
+        # Время на машине тестов не показательно, проверяем запросы.
+        budgets = {
+            view: {'queries': budget['queries']}
+            for view, budget in settings.BENCHMARK_BUDGETS.items()
+        }
+        self.assertEqual(benchmark.check(results, budgets), [])
+
+    def test_check_reports_exceeded_budget(self):
+        result = benchmark.Result('index', '/', 1.0, 30.0, 9)
+        violations = benchmark.check(
+            [result], {'index': {'p99_ms': 20, 'queries': 5}}
+        )
+        self.assertEqual(len(violations), 2)
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from yatube.cache_backends import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'другое'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_values_are_misses(self):
+        """Просроченная запись не возвращается."""
+        self.cache.set('key', 'value', timeout=1)
+        self.cache.touch('key', timeout=-1)
+        self.assertEqual(self.cache.get('key', 'нет'), 'нет')
+
+    def test_workers_share_entries_and_stats(self):
+        """Два экземпляра на одном файле видят общие ключи и счётчики."""
+        other = SQLiteCache(self.path, {})
+        self.cache.set_many({'a': 1, 'b': 2}, timeout=None)
+        self.assertEqual(other.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        self.cache.get('c')
+        self.cache.stats()
+        stats = other.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['sets'], 2)
+        self.assertEqual(stats['entries'], 2)
+
+    def test_cull_counts_evictions(self):
+        """Переполнение вытесняет записи и учитывает это в статистике."""
+        cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}
+        })
+        cache.cull_check_every = 1
+        for number in range(20):
+            cache.set(f'key-{number}', number, timeout=100 + number)
+        stats = cache.stats()
+        self.assertLessEqual(stats['entries'], 11)
+        self.assertGreater(stats['evictions'], 0)
@@ -0,0 +1,118 @@
+import warnings
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Follow, Group, Post, User
+
+
+class DeltaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            for number in range(5)
+        ]
+        cls.foreign = Post.objects.create(text='Чужой', author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.url = reverse('api:delta')
+
+    def get(self, **params):
+        return self.client.get(self.url, params)
+
+    def texts(self, data):
+        return [post['text'] for post in data['results']]
+
+    def test_first_poll_returns_high_water_mark(self):
+        data = self.get(feed='group', slug='group').json()
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['since_id'], self.posts[-1].pk)
+        empty = self.get(feed='author', username='reader').json()
+        self.assertEqual(empty['since_id'], 0)
+
+    def test_returns_only_newer_posts_of_feed(self):
+        """Новые посты от старых к новым и только из своей ленты."""
+        feeds = {
+            'index': {'feed': 'index'},
+            'group': {'feed': 'group', 'slug': 'group'},
+            'author': {'feed': 'author', 'username': 'author'},
+            'follow': {'feed': 'follow'},
+        }
+        for name, params in feeds.items():
+            with self.subTest(feed=name):
+                data = self.get(since_id=self.posts[2].pk, **params).json()
+                expected = ['Пост 3', 'Пост 4']
+                if name == 'index':
+                    expected.append('Чужой')
+                self.assertEqual(self.texts(data), expected)
+                self.assertFalse(data['has_more'])
+
+    def test_naive_since_is_local_time(self):
+        """since без смещения читается в часовом поясе сайта."""
+        moment = timezone.localtime(self.posts[3].pub_date)
+        since = moment.replace(tzinfo=None).isoformat()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            data = self.get(
+                feed='author', username='author', since=since
+            ).json()
+        self.assertEqual(data['since_id'], self.posts[4].pk)
+
+    def test_since_timestamp(self):
+        since = self.posts[3].pub_date.isoformat()
+        data = self.get(feed='author', username='author', since=since).json()
+        self.assertEqual(self.texts(data), ['Пост 4'])
+        self.assertEqual(data['since_id'], self.posts[4].pk)
+
+    @override_settings(FEED_DELTA_LIMIT=2)
+    def test_delta_is_capped(self):
+        data = self.get(feed='author', username='author', since_id=0).json()
+        self.assertEqual(self.texts(data), ['Пост 0', 'Пост 1'])
+        self.assertTrue(data['has_more'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(self.texts(data), ['Пост 2', 'Пост 3'])
+
+    def test_deleted_mark_continues_from_older_post(self):
+        seen = self.posts[2].pk
+        Post.objects.filter(pk=seen).delete()
+        data = self.get(feed='group', slug='group', since_id=seen).json()
+        self.assertEqual(self.texts(data), ['Пост 3', 'Пост 4'])
+
+    def test_unchanged_feed_is_not_modified(self):
+        """Пока в ленте нет нового, повторный опрос получает 304."""
+        first = self.get(feed='group', slug='group').json()
+        response = self.client.get(first['next'])
+        self.assertEqual(response.json()['results'], [])
+        repeat = self.client.get(
+            first['next'], HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(repeat.status_code, 304)
+        Post.objects.create(text='Новый', author=self.author, group=self.group)
+        repeat = self.client.get(
+            first['next'], HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(self.texts(repeat.json()), ['Новый'])
+
+    def test_bad_requests(self):
+        for since_id in ('x', '²', '9' * 23):
+            with self.subTest(since_id=since_id):
+                response = self.get(since_id=since_id)
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.get(since='вчера').status_code, 400)
+        self.assertEqual(self.get(limit='0').status_code, 400)
+        self.assertEqual(self.get(feed='other').status_code, 400)
+        response = Client().get(self.url, {'feed': 'follow'})
+        self.assertEqual(response.status_code, 401)
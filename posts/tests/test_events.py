@@ -0,0 +1,142 @@
+import json
+
+from django.core.cache import cache as django_cache
+from django.http import StreamingHttpResponse
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from posts import cache, events, feed
+from posts.models import Follow, Group, Post, User
+
+
+def parse(chunk):
+    fields = dict(
+        line.split(': ', 1) for line in chunk.strip().splitlines()
+    )
+    return int(fields['id']), json.loads(fields['data'])
+
+
+class HubTests(TestCase):
+    def test_publish_reaches_subscribed_channels_only(self):
+        hub = events.Hub()
+        index = hub.subscribe(['index'])
+        group = hub.subscribe(['group:1'])
+        self.assertEqual(hub.publish(['index', 'profile:1'], {'id': 1}), 1)
+        self.assertEqual(index.get(0), [{'id': 1}])
+        self.assertEqual(group.get(0), [])
+        hub.unsubscribe(index)
+        self.assertEqual(hub.publish(['index'], {'id': 2}), 0)
+
+    @override_settings(EVENTS_QUEUE_SIZE=2)
+    def test_slow_subscriber_drops_overflow(self):
+        hub = events.Hub()
+        subscription = hub.subscribe(['index'])
+        for pk in range(5):
+            hub.publish(['index'], {'id': pk})
+        self.assertEqual(len(subscription.get(0)), 2)
+
+
+@override_settings(
+    EVENTS_ENABLED=True, EVENTS_POLL_INTERVAL=0.01, EVENTS_STREAM_SECONDS=60
+)
+class StreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.first = Post.objects.create(
+            text='Первый', author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        django_cache.clear()
+
+    def test_stream_catches_up_from_last_id(self):
+        spec = feed.resolve({'feed': 'group', 'slug': 'group'}, self.reader)
+        stream = events.stream(spec, last_id=0)
+        self.assertEqual(next(stream), f'retry: {events.RETRY_MS}\n\n')
+        pk, data = parse(next(stream))
+        self.assertEqual(pk, self.first.pk)
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(next(stream), ': ping\n\n')
+        stream.close()
+
+    def test_hub_event_is_sent_without_polling(self):
+        spec = feed.resolve({'feed': 'follow'}, self.reader)
+        stream = events.stream(spec)
+        next(stream)
+        self.assertEqual(next(stream), ': ping\n\n')
+        post = Post.objects.create(text='Второй', author=self.author)
+        events.publish_post(post)
+        with self.assertNumQueries(0):
+            pk, data = parse(next(stream))
+        self.assertEqual(pk, post.pk)
+        stream.close()
+        self.assertEqual(
+            events.hub.publish([cache.profile(self.author.pk)], {}), 0
+        )
+
+    def test_other_worker_posts_are_polled(self):
+        spec = feed.resolve({'feed': 'index'}, self.reader)
+        stream = events.stream(spec)
+        next(stream)
+        next(stream)
+        # Пост без publish_post: так выглядит запись другого процесса.
+        post = Post.objects.create(text='Третий', author=self.author)
+        self.assertEqual(parse(next(stream))[0], post.pk)
+        stream.close()
+
+    def test_view_streams_events(self):
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(
+            reverse('post_events'), {'feed': 'author', 'username': 'author'},
+            HTTP_LAST_EVENT_ID='0',
+        )
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        self.assertEqual(parse(next(chunks).decode())[0], self.first.pk)
+        response.close()
+
+    def test_view_rejects_bad_requests(self):
+        url = reverse('post_events')
+        client = Client()
+        self.assertEqual(client.get(url, {'feed': 'follow'}).status_code, 403)
+        self.assertEqual(client.get(url, {'feed': 'other'}).status_code, 400)
+        for since in ('x', '²', '1' * 30):
+            with self.subTest(since=since):
+                response = client.get(url, {'since': since})
+                self.assertEqual(response.status_code, 400)
+        missing = Client().get(url, {'feed': 'group', 'slug': 'nope'})
+        self.assertEqual(missing.status_code, 404)
+
+    @override_settings(EVENTS_ENABLED=False)
+    def test_disabled_by_setting(self):
+        """Без EVENTS_ENABLED нет ни потока, ни баннера на лентах."""
+        client = Client()
+        self.assertEqual(client.get(reverse('post_events')).status_code, 404)
+        self.assertNotContains(client.get(reverse('index')), 'js-live-posts')
+
+    def test_enabled_feed_shows_banner(self):
+        self.assertContains(Client().get(reverse('index')), 'js-live-posts')
+
+
+class PublishTests(TransactionTestCase):
+    def test_new_post_is_published_after_commit(self):
+        author = User.objects.create_user(username='author')
+        subscription = events.hub.subscribe([cache.INDEX])
+        try:
+            client = Client()
+            client.force_login(author)
+            client.post(reverse('new_post'), {'text': 'Свежий'})
+            published = subscription.get(0)
+        finally:
+            events.hub.unsubscribe(subscription)
+        self.assertEqual(len(published), 1)
+        self.assertEqual(published[0]['author'], 'author')
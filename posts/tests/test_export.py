@@ -0,0 +1,84 @@
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = override_settings(
+            MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR)
+        )
+        cls.media.enable()
+        cls.user = User.objects.create_user(username='Andr')
+        cls.other = User.objects.create_user(username='Olga')
+        cls.post = Post.objects.create(text='Первый', author=cls.user)
+        cls.post.image.save('export.gif', ContentFile(SMALL_GIF))
+        Post.objects.create(text='Второй', author=cls.user)
+        Post.objects.create(text='Чужой', author=cls.other)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Свой')
+        Comment.objects.create(post=cls.post, author=cls.other, text='Чужой')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        cls.media.disable()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('profile_export', args=[self.user.username])
+
+    def test_ndjson_streams_own_records(self):
+        """NDJSON: профиль, свои посты и свои комментарии по строке."""
+        response = self.client.get(self.url)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        types = [record['type'] for record in records]
+        self.assertEqual(types, ['user', 'post', 'post', 'comment'])
+        self.assertEqual(records[1]['text'], 'Первый')
+        self.assertTrue(records[1]['image_url'])
+        self.assertEqual(records[3]['text'], 'Свой')
+
+    def test_zip_contains_data_and_images(self):
+        """В архиве данные и картинки постов."""
+        response = self.client.get(self.url, {'format': 'zip'})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertIsNone(archive.testzip())
+        data = archive.read('data.ndjson').decode().splitlines()
+        self.assertEqual(len(data), 4)
+        image = f'images/{self.post.image.name}'
+        self.assertEqual(archive.read(image), SMALL_GIF)
+
+    def test_export_only_for_owner(self):
+        """Чужую выгрузку не отдаём, анонима отправляем на вход."""
+        url = reverse('profile_export', args=[self.other.username])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = Client().get(self.url)
+        self.assertEqual(response.status_code, 302)
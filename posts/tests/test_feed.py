@@ -0,0 +1,112 @@
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from posts import feed
+from posts.models import FeedEntry, Follow, Post, User
+from tasks.queue import run_pending
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Старый пост', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_follow_backfills_feed(self):
+        """Подписка раскладывает в ленту уже опубликованные посты."""
+        self.reader_client.get(
+            reverse('profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=self.post
+        ).exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков при записи."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        entry = FeedEntry.objects.get(user=self.reader, post=new_post)
+        self.assertEqual(entry.pub_date, new_post.pub_date)
+        self.assertEqual(entry.author, self.author)
+
+    def test_unfollow_prunes_feed(self):
+        """Отписка удаляет посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.reader).exists()
+        )
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual(len(response.context['page']), 0)
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(
+            list(feed.follow_feed(self.reader)), [new_post, self.post]
+        )
+
+    @override_settings(FEED_SYNC_FANOUT_LIMIT=0)
+    def test_large_fan_out_runs_in_worker(self):
+        """Раскладка поста автора с многими подписчиками идёт в фоне."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            FeedEntry.objects.filter(post=new_post).exists()
+        )
+        run_pending()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=new_post).exists()
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_follow_pages_merge_pushed_and_pulled_authors(self):
+        """Страницы подписок сливают записи ленты и посты популярных."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=other)
+        FeedEntry.objects.create(
+            user=self.reader, post=self.post,
+            author=self.author, pub_date=self.post.pub_date,
+        )
+        posts = [
+            Post.objects.create(text=f'Пост {number}', author=other)
+            for number in range(3)
+        ]
+        paginator = feed.FollowPaginator(self.reader, 2, [other.pk])
+        page = paginator.get_page()
+        self.assertEqual(list(page), posts[:0:-1])
+        page = paginator.get_page(page.next_cursor)
+        self.assertEqual(list(page), [posts[0], self.post])
+        self.assertFalse(page.has_next())
+        page = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(page), posts[:0:-1])
+
+
+class FanoutModeTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.other = User.objects.create_user(username='other')
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_back_from_pull_keeps_posts_in_feed(self):
+        """Автор, вернувшийся к раскладке, не пропадает из ленты."""
+        Follow.objects.create(user=self.other, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        Follow.objects.filter(user=self.other).delete()
+        self.assertEqual(list(feed.follow_feed(self.reader)), [post])
@@ -0,0 +1,71 @@
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, FeedEntry, Group, Post, User
+from posts.paginator import CursorPaginator
+
+
+class QueryPlanTests(TestCase):
+    """Ленты и комментарии читаются по индексу, без сортировки в памяти."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Коментарий'
+        )
+
+    def assertUsesIndex(self, queryset, index, seek=True):
+        """Индекс без сортировки; страница после ключа - поиск диапазона."""
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+        if seek:
+            self.assertRegex(
+                plan, r'SEARCH .*USING INDEX %s \(.*[<>]\?\)' % index
+            )
+
+    def pages(self, posts, ordering=('pub_date', 'pk')):
+        """Страницы CursorPaginator после ключа и новые для /api/v1/delta/."""
+        paginator = CursorPaginator(posts, 10, ordering)
+        key = [timezone.now(), self.post.pk]
+        return [
+            paginator._descending().filter(paginator._seek(key, 'lt'))[:11],
+            paginator._ascending().filter(paginator._seek(key, 'gt'))[:11],
+            paginator.after(key)[:101],
+        ]
+
+    def test_plans(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Проверяются планы SQLite')
+        listings = {
+            'post_pub_date_idx': Post.objects.for_feed(),
+            'post_group_pub_date_idx': self.group.posts.for_feed(),
+            'post_author_pub_date_idx': self.author.posts.for_feed(),
+        }
+        for index, posts in listings.items():
+            self.assertUsesIndex(
+                posts.order_by('-pub_date', '-pk')[:11], index, seek=False
+            )
+            for queryset in self.pages(posts):
+                with self.subTest(index=index, query=str(queryset.query)):
+                    self.assertUsesIndex(queryset, index)
+        entries = FeedEntry.objects.filter(user=self.author)
+        self.assertUsesIndex(
+            entries.order_by('-pub_date', '-post_id')[:11],
+            'feed_user_pub_date_idx', seek=False
+        )
+        for queryset in self.pages(entries, ('pub_date', 'post_id')):
+            with self.subTest(query=str(queryset.query)):
+                self.assertUsesIndex(queryset, 'feed_user_pub_date_idx')
+        comments = self.post.comments.all()
+        self.assertUsesIndex(comments, 'comment_post_created_idx', seek=False)
+        for queryset in self.pages(comments, ('created', 'pk')):
+            with self.subTest(query=str(queryset.query)):
+                self.assertUsesIndex(queryset, 'comment_post_created_idx')
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import cache as django_cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts import cache, search
+from posts.invalidation import namespaces_for
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class InvalidationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        django_cache.clear()
+
+    def test_post_write_makes_its_feeds_stale(self):
+        """Запись поста сбрасывает все ленты, где он виден."""
+        self.assertEqual(namespaces_for(self.post), {
+            cache.INDEX,
+            cache.post(self.post.pk),
+            cache.group(self.group.pk),
+            cache.profile(self.author.pk),
+            cache.follow(self.reader.pk),
+        })
+
+    def test_moved_post_makes_both_groups_stale(self):
+        """Перенос поста сбрасывает и прежнюю, и новую группу."""
+        before = cache.version(cache.group(self.group.pk))
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertNotEqual(
+            cache.version(cache.group(self.group.pk)), before
+        )
+
+    def test_comment_bumps_post_versions(self):
+        """Комментарий меняет версии страницы поста и лент."""
+        namespaces = [cache.post(self.post.pk), cache.INDEX]
+        before = cache.get_versions(*namespaces)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Коментарий'
+        )
+        after = cache.get_versions(*namespaces)
+        for old, new in zip(before, after):
+            self.assertNotEqual(old, new)
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_does_not_touch_follower_feeds(self):
+        """Подписчики популярного автора не перебираются при записи."""
+        self.assertNotIn(
+            cache.follow(self.reader.pk), namespaces_for(self.post)
+        )
+
+    def test_login_does_not_invalidate_profile(self):
+        """Обновление last_login не меняет версию профиля."""
+        before = cache.version(cache.profile(self.author.pk))
+        self.author.save(update_fields=['last_login'])
+        self.assertEqual(cache.version(cache.profile(self.author.pk)), before)
+
+    def test_post_delete_skips_per_comment_work(self):
+        """Удаление поста не сбрасывает ленты за каждый его комментарий."""
+        def delete(comments):
+            post = Post.objects.create(text='Пост', author=self.author)
+            for number in range(comments):
+                Comment.objects.create(
+                    post=post, author=self.reader, text='Слово %s' % number
+                )
+            with mock.patch('posts.cache.bump') as bump:
+                with CaptureQueriesContext(connection) as queries:
+                    post.delete()
+            return len(queries), bump.call_count
+
+        self.assertEqual(delete(1), delete(20))
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(stats.comment_count, 0)
+        terms = search.query_terms('слово')
+        self.assertEqual(search.get_index().search(terms, 10), [])
@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.template.base import Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube import metrics
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.client = Client()
+
+    def test_request_is_measured_per_url_name(self):
+        """Запросы к главной копятся под именем index."""
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        index = metrics.registry.summary()['index']
+        self.assertEqual(index['requests'], 2)
+        self.assertEqual(index['wall_ms']['count'], 2)
+        self.assertGreater(index['sql_queries']['mean'], 0)
+        self.assertGreater(index['template_ms']['mean'], 0)
+        self.assertGreater(index['cache_hits'], 0)
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_only_counted(self):
+        self.client.get(reverse('index'))
+        index = metrics.registry.summary()['index']
+        self.assertEqual(index['requests'], 1)
+        self.assertEqual(index['wall_ms']['count'], 0)
+
+    def test_endpoints_are_protected(self):
+        """Метрики видят только персонал и скрейпер с токеном."""
+        self.client.get(reverse('index'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        response = self.client.get(
+            reverse('metrics_prometheus'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'yatube_wall_ms_bucket{view="index",le="+Inf"} 1',
+            response.content.decode()
+        )
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('index', response.json())
+
+    def test_prometheus_exports_cumulative_counters(self):
+        """Prometheus получает счётчики с запуска, а не окно."""
+        self.client.get(reverse('index'))
+        # Первый запрос ушёл из скользящего окна.
+        window = metrics.registry.views['index'].histograms['wall_ms']
+        window.slots = [None] * len(window.slots)
+        self.client.get(reverse('index'))
+        body = metrics.registry.prometheus()
+        self.assertIn('yatube_wall_ms_count{view="index"} 2', body)
+        self.assertIn('# TYPE yatube_requests_total counter', body)
+        self.assertIn('yatube_requests_total{view="index"} 2', body)
+        summary = metrics.registry.summary()['index']
+        self.assertEqual(summary['wall_ms']['count'], 1)
+
+    def test_wrong_token_is_rejected(self):
+        response = self.client.get(
+            reverse('metrics_prometheus'), HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_template_timing_is_installed_only_when_enabled(self):
+        with mock.patch.object(Template, 'render', metrics._template_render):
+            with override_settings(METRICS_SAMPLE_RATE=0.0):
+                metrics.install()
+                self.assertIs(Template.render, metrics._template_render)
+            metrics.install()
+            self.assertIs(Template.render, metrics._timed_render)
+
+
+class RollingHistogramTests(TestCase):
+    def test_old_slots_expire(self):
+        histogram = metrics.RollingHistogram((10, 100), window=60, slots=6)
+        histogram.observe(5, now=0)
+        histogram.observe(50, now=30)
+        self.assertEqual(histogram.snapshot(now=30)[2], 2)
+        self.assertEqual(histogram.snapshot(now=65)[2], 1)
+        self.assertEqual(histogram.snapshot(now=200)[2], 0)
+
+    def test_quantile_interpolates_within_bucket(self):
+        histogram = metrics.RollingHistogram((10, 100), window=60)
+        for value in (1, 2, 3, 50):
+            histogram.observe(value, now=0)
+        self.assertEqual(histogram.quantile(0.5, now=0), 10 * 2 / 3)
+        self.assertEqual(histogram.quantile(1.0, now=0), 100)
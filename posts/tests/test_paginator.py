@@ -0,0 +1,96 @@
+import base64
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.paginator import CursorPaginator
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Andr')
+        for number in range(25):
+            Post.objects.create(text='Текст %s' % number, author=cls.user)
+        # Одинаковая дата у части постов проверяет сравнение по id.
+        Post.objects.filter(text__in=['Текст 9', 'Текст 10', 'Текст 11']) \
+            .update(pub_date=timezone.now())
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def expected(self):
+        return list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def test_next_pages_cover_all_posts_once(self):
+        """Переход по курсорам проходит все посты без повторов."""
+        seen = []
+        page = self.paginator.get_page()
+        seen.extend(page)
+        while page.has_next():
+            page = self.paginator.get_page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, self.expected())
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает ту же предыдущую страницу."""
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        back = self.paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_page_costs_one_query_without_count(self):
+        """Страница по курсору - один запрос без COUNT и OFFSET."""
+        first = self.paginator.get_page()
+        with self.assertNumQueries(1) as context:
+            page = self.paginator.get_page(first.next_cursor)
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('COUNT', sql)
+        self.assertNotIn('OFFSET', sql)
+        self.assertEqual(list(page), self.expected()[10:20])
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        page = self.paginator.get_page('не-курсор')
+        self.assertEqual(list(page), self.expected()[:10])
+
+    def test_out_of_range_input_falls_back_to_first_page(self):
+        """Курсор с null или огромным id и огромный ?page= - страница 1."""
+        now = timezone.now().isoformat()
+        cursors = [
+            base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            for values in (['n', None, None], ['n', now, 10 ** 30])
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(list(page), self.expected()[:10])
+        page = self.paginator.get_page(number='99999999999999999999')
+        self.assertEqual(list(page), self.expected()[:10])
+        client = Client()
+        client.force_login(self.user)
+        urls = [
+            reverse('index'),
+            reverse('follow_index'),
+            reverse('profile', args=[self.user.username]),
+            reverse('api:index'),
+            reverse('api:follow_index'),
+        ]
+        params = [{'cursor': cursor} for cursor in cursors]
+        params.append({'page': '99999999999999999999'})
+        for url in urls:
+            for query in params:
+                with self.subTest(url=url, query=query):
+                    response = client.get(url, query)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_index_renders_cursor_links(self):
+        """Ссылки пагинатора на главной ведут по курсору."""
+        response = Client().get(reverse('index'))
+        page = response.context['page']
+        self.assertContains(response, f'?cursor={page.next_cursor}')
@@ -0,0 +1,93 @@
+import threading
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+from yatube.parallel import gather
+
+
+class GatherTests(SimpleTestCase):
+    def test_calls_run_concurrently(self):
+        """Оба вызова ждут друг друга: по очереди они бы не дождались."""
+        barrier = threading.Barrier(2, timeout=5)
+        self.assertEqual(
+            sorted(gather(barrier.wait, barrier.wait)), [0, 1]
+        )
+
+    def test_results_keep_order(self):
+        self.assertEqual(gather(lambda: 1, lambda: 2, lambda: 3), [1, 2, 3])
+
+    def test_error_is_raised_in_caller(self):
+        def missing():
+            raise Http404
+
+        with self.assertRaises(Http404):
+            gather(lambda: 1, missing)
+
+    @override_settings(PARALLEL_QUERIES=False)
+    def test_disabled_runs_inline(self):
+        caller = threading.get_ident()
+        self.assertEqual(
+            gather(threading.get_ident, threading.get_ident), [caller] * 2
+        )
+
+
+class GatherInTransactionTests(TestCase):
+    def test_transaction_runs_inline(self):
+        """Другие соединения не видят строк незафиксированной транзакции."""
+        caller = threading.get_ident()
+        self.assertEqual(
+            gather(threading.get_ident, threading.get_ident), [caller] * 2
+        )
+
+
+class ParallelViewsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(text='Пост автора', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_profile(self):
+        response = self.client.get(reverse('profile', args=['author']))
+        self.assertContains(response, 'Пост автора')
+        self.assertTrue(response.context['is_following'])
+        self.assertEqual(response.context['author'], self.author)
+        missing = self.client.get(reverse('profile', args=['nobody']))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_post_view(self):
+        response = self.client.get(
+            reverse('post', args=['author', self.post.pk])
+        )
+        self.assertEqual(response.context['post'], self.post)
+        wrong = self.client.get(reverse('post', args=['reader', self.post.pk]))
+        self.assertEqual(wrong.status_code, 404)
+
+    def test_measured_requests_count_all_queries(self):
+        """Замеры запросов видят только соединение своего потока."""
+        url = reverse('post', args=['author', self.post.pk])
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url)
+        sql = [query['sql'] for query in captured]
+        self.assertIn('posts_comment', ' '.join(sql))
+        self.assertIn('posts_userstats', ' '.join(sql))
+        executed = []
+
+        def wrapper(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            self.client.get(url)
+        self.assertEqual(len(executed), len(sql))
@@ -0,0 +1,70 @@
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from yatube import querylog
+
+
+class NormalizeTests(TestCase):
+    def test_values_are_replaced(self):
+        self.assertEqual(
+            querylog.normalize(
+                "SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s) "
+                "LIMIT 21"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?'
+        )
+        self.assertEqual(
+            querylog.normalize('SELECT * FROM t WHERE b IN (%s)'),
+            querylog.normalize('SELECT * FROM t WHERE b IN (%s, %s)')
+        )
+
+
+@override_settings(QUERYLOG_N_PLUS_ONE=5)
+class InspectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        for number in range(6):
+            reader = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(post=cls.post, author=reader, text='Да')
+
+    def test_n_plus_one_in_template_is_found(self):
+        """Повторный запрос автора в цикле шаблона - это N+1."""
+        template = Template(
+            '{% for comment in comments %}\n'
+            '{{ comment.author.username }}{% endfor %}'
+        )
+        with self.assertLogs('yatube.querylog', 'WARNING'):
+            with querylog.inspect('comments') as inspector:
+                template.render(Context({
+                    'comments': Comment.objects.filter(post=self.post)
+                }))
+        [shape] = inspector.n_plus_one()
+        self.assertEqual(shape.count, 6)
+        self.assertIn('auth_user', shape.sql)
+        self.assertIn(':2', shape.source)
+        self.assertIn('test_querylog.py', shape.source)
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_slow_queries_are_logged_with_source(self):
+        with self.assertLogs('yatube.querylog', 'WARNING') as logs:
+            with querylog.inspect('slow'):
+                Post.objects.count()
+        self.assertIn('Медленный запрос', logs.output[0])
+        self.assertIn('test_querylog.py', logs.output[0])
+
+    def test_post_page_has_no_n_plus_one(self):
+        """Авторы комментариев приходят одним запросом с постом."""
+        found = []
+        querylog.add_listener(found.append)
+        try:
+            Client().get(reverse('post', args=['author', self.post.pk]))
+        finally:
+            querylog.remove_listener(found.append)
+        [inspector] = found
+        self.assertEqual(inspector.label, 'post')
+        self.assertEqual(inspector.n_plus_one(), [])
@@ -0,0 +1,107 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube.routers import PIN_COOKIE, ReplicaRouter
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Основная тестовая база и реплика в отдельном файле SQLite.
+
+    Репликацию изображает replicate(): копия основной базы через
+    sqlite3 backup. Всё, что записано после неё, на реплике не видно.
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'replica.sqlite3')
+        connections.databases['replica'] = {
+            'ENGINE': 'yatube.sqlite3',
+            'NAME': cls.path,
+            'TEST': {'NAME': cls.path},
+        }
+        connections.ensure_defaults('replica')
+        connections.prepare_test_settings('replica')
+        cls.replicas = override_settings(DATABASE_REPLICAS=['replica'])
+        cls.replicas.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replicas.disable()
+        connections['replica'].close()
+        del connections.databases['replica']
+        delattr(connections._connections, 'replica')
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.replicated = Post.objects.create(
+            text='Уже на реплике', author=self.author
+        )
+        self.replicate()
+        self.fresh = Post.objects.create(
+            text='Только в основной', author=self.author
+        )
+
+    def replicate(self):
+        connections['replica'].close()
+        source = connections['default']
+        source.ensure_connection()
+        target = sqlite3.connect(self.path)
+        source.connection.backup(target)
+        target.close()
+
+    def test_feed_reads_from_replica(self):
+        response = Client().get(reverse('index'))
+        self.assertContains(response, 'Уже на реплике')
+        self.assertNotContains(response, 'Только в основной')
+
+    def test_other_views_read_primary(self):
+        response = Client().get(
+            reverse('post', args=['author', self.fresh.pk])
+        )
+        self.assertContains(response, 'Только в основной')
+
+    def test_own_write_pins_reads_to_primary(self):
+        """После своей записи пользователь видит её в ленте."""
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(reverse('new_post'), {'text': 'Мой новый'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertContains(client.get(reverse('index')), 'Мой новый')
+        self.assertNotContains(Client().get(reverse('index')), 'Мой новый')
+
+    def test_fresh_replica_read_is_not_cached(self):
+        """Отстающая реплика не оставляет в кеше ленту под новой версией."""
+        response = Client().get(reverse('index'))
+        self.assertNotContains(response, 'Только в основной')
+        self.assertNotIn('ETag', response)
+        self.replicate()
+        response = Client().get(reverse('index'))
+        self.assertContains(response, 'Только в основной')
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_settled_replica_read_is_cached(self):
+        self.replicate()
+        self.assertIn('ETag', Client().get(reverse('index')))
+
+    def test_reads_without_writes_do_not_pin(self):
+        response = Client().get(reverse('index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_replica_is_not_migrated(self):
+        router = ReplicaRouter()
+        self.assertIs(router.allow_migrate('replica', 'posts'), False)
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
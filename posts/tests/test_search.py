@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post, SearchToken, User
+
+
+class StemTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова приводятся к одной основе."""
+        self.assertEqual(search.stem('книги'), search.stem('книгам'))
+        self.assertEqual(search.stem('бегать'), search.stem('бегал'))
+        self.assertEqual(search.stem('Ёлки'), search.stem('елка'))
+
+    def test_latin_words_are_not_stemmed(self):
+        self.assertEqual(search.tokenize('Django работает'),
+                         ['django', 'работа'])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.books = Post.objects.create(
+            text='Читаю книги про котов', author=cls.author
+        )
+        cls.sea = Post.objects.create(
+            text='Летом поедем к морю', author=cls.author
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query):
+        response = self.client.get(reverse('search'), {'q': query})
+        return [post.pk for post in response.context['results']]
+
+    def test_finds_other_word_forms(self):
+        """Поиск находит пост по другой форме слова."""
+        self.assertEqual(self.found('книгам'), [self.books.pk])
+        self.assertEqual(self.found('книги кот'), [self.books.pk])
+        self.assertEqual(self.found('книги море'), [])
+
+    def test_comments_are_searched(self):
+        """Пост находится по тексту комментария к нему."""
+        comment = Comment.objects.create(
+            post=self.sea, author=self.author, text='Возьмите палатку'
+        )
+        self.assertEqual(self.found('палатки'), [self.sea.pk])
+        comment.delete()
+        self.assertEqual(self.found('палатки'), [])
+
+    def test_index_follows_edits(self):
+        """После правки пост ищется по новому тексту, а не по старому."""
+        post = Post.objects.get(pk=self.sea.pk)
+        post.text = 'Зимой поедем в горы'
+        post.save()
+        self.assertEqual(self.found('море'), [])
+        self.assertEqual(self.found('горах'), [post.pk])
+
+    def test_thumbnail_save_skips_reindex(self):
+        """Сохранение полей без текста не трогает индекс."""
+        with mock.patch.object(search.get_index(), 'index_post') as index:
+            self.books.save(update_fields=['thumbnail'])
+            index.assert_not_called()
+            self.books.save(update_fields=['text'])
+            index.assert_called_once_with(self.books)
+
+    def test_ranking(self):
+        """Пост, где слово встречается чаще, стоит выше."""
+        often = Post.objects.create(
+            text='Коты, коты и снова коты', author=self.author
+        )
+        self.assertEqual(self.found('коты'), [often.pk, self.books.pk])
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('search'), {'q': '  '})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results'], [])
+
+    def test_token_index_fallback(self):
+        """Без FTS5 поиск идёт по таблице SearchToken."""
+        with mock.patch.object(search, '_index', search.TokenIndex()):
+            call_command('rebuild_search_index', stdout=mock.Mock())
+            self.assertTrue(SearchToken.objects.exists())
+            Comment.objects.create(
+                post=self.sea, author=self.author, text='Море тёплое'
+            )
+            self.assertEqual(self.found('книгам'), [self.books.pk])
+            self.assertEqual(self.found('моря'), [self.sea.pk])
+            self.assertEqual(self.found('книги море'), [])
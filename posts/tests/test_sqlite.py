@@ -0,0 +1,39 @@
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Group
+from yatube.sqlite3 import serialized
+
+
+class PragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connection_gets_pragmas(self):
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        # 1 - NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+
+class SerializedTests(TransactionTestCase):
+    def test_write_transaction_starts_immediate(self):
+        """serialized() занимает запись сразу, а не на первом INSERT."""
+        with CaptureQueriesContext(connection) as captured:
+            with serialized():
+                Group.objects.create(title='Тест', slug='test')
+        self.assertEqual(captured[0]['sql'], 'BEGIN IMMEDIATE')
+        self.assertFalse(connection.begin_immediate)
+
+    def test_nested_block_keeps_outer_transaction(self):
+        with CaptureQueriesContext(connection) as captured:
+            with serialized():
+                with serialized():
+                    Group.objects.create(title='Тест', slug='test')
+        statements = [query['sql'] for query in captured]
+        self.assertEqual(statements.count('BEGIN IMMEDIATE'), 1)
+        self.assertNotIn('BEGIN', statements)
@@ -0,0 +1,63 @@
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User, UserStats
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        self.author_client.post(reverse('new_post'), {'text': 'Пост'})
+        post = Post.objects.get(author=self.author)
+        self.reader_client.post(
+            reverse('add_comment', args=['author', post.id]),
+            {'text': 'Коментарий'}
+        )
+        self.reader_client.get(reverse('profile_follow', args=['author']))
+        author, reader = self.stats(self.author), self.stats(self.reader)
+        self.assertEqual(author.post_count, 1)
+        self.assertEqual(author.follower_count, 1)
+        self.assertEqual(reader.following_count, 1)
+        self.assertEqual(reader.comment_count, 1)
+
+        self.reader_client.get(reverse('profile_unfollow', args=['author']))
+        post.delete()
+        author, reader = self.stats(self.author), self.stats(self.reader)
+        self.assertEqual(author.post_count, 0)
+        self.assertEqual(author.follower_count, 0)
+        self.assertEqual(reader.following_count, 0)
+        self.assertEqual(reader.comment_count, 0)
+
+    def test_profile_reads_counters_without_aggregates(self):
+        """Страница профиля не считает посты и подписчиков COUNT-ом."""
+        Post.objects.create(text='Пост', author=self.author)
+        with self.assertNumQueries(5) as context:
+            response = self.reader_client.get(
+                reverse('profile', args=['author'])
+            )
+        self.assertEqual(response.context['number_posts'], 1)
+        for query in context.captured_queries:
+            self.assertNotIn('COUNT(*)', query['sql'])
+
+    def test_rebuild_command_fixes_drift(self):
+        """Команда rebuild_user_stats пересчитывает счётчики."""
+        Post.objects.create(text='Пост', author=self.author)
+        UserStats.objects.filter(user=self.author).update(post_count=7)
+        call_command('rebuild_user_stats', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.stats(self.author).post_count, 1)
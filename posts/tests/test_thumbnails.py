@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from tasks.models import Task
+from tasks.queue import run_pending
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # временная папка для медиафайлов
+        cls.media = override_settings(
+            MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR)
+        )
+        cls.media.enable()
+        cls.user = User.objects.create_user(username='Andr')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        cls.media.disable()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def publish(self):
+        self.authorized_client.post(
+            reverse('new_post'),
+            {'text': 'С картинкой', 'image': self.upload()}
+        )
+        run_pending()
+        return Post.objects.get(text='С картинкой')
+
+    def upload(self):
+        return SimpleUploadedFile(
+            name='thumb.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+
+    def test_new_post_queues_thumbnail(self):
+        """Миниатюра готовится воркером после публикации поста."""
+        self.authorized_client.post(
+            reverse('new_post'),
+            {'text': 'В очереди', 'image': self.upload()}
+        )
+        self.assertFalse(Post.objects.get(text='В очереди').thumbnail)
+        post = self.publish()
+        self.assertTrue(post.thumbnail)
+        self.assertTrue(os.path.exists(
+            os.path.join(settings.MEDIA_ROOT, post.thumbnail)
+        ))
+
+    def test_feed_does_not_render_thumbnails(self):
+        """Лента берёт готовый адрес миниатюры и не вызывает sorl."""
+        post = self.publish()
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            response = Client().get(reverse('index'))
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, post.thumbnail_url)
+
+    def test_edit_without_new_image_keeps_thumbnail(self):
+        """Правка текста не пересоздаёт миниатюру."""
+        post = self.publish()
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            self.authorized_client.post(
+                reverse('post_edit', args=[self.user, post.pk]),
+                {'text': 'Новый текст'}
+            )
+            run_pending()
+        get_thumbnail.assert_not_called()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+
+    def test_new_image_drops_old_thumbnail(self):
+        """Новая картинка сбрасывает миниатюру прежней до работы воркера."""
+        post = self.publish()
+        self.authorized_client.post(
+            reverse('post_edit', args=[self.user, post.pk]),
+            {'text': 'Новый текст', 'image': self.upload()}
+        )
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail)
+        run_pending()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+
+    def test_failed_thumbnail_is_retried(self):
+        """Ошибка Pillow оставляет задачу в очереди на повтор."""
+        with mock.patch(
+            'posts.thumbnails.get_thumbnail', side_effect=OSError('битый')
+        ):
+            post = self.publish()
+        self.assertFalse(post.thumbnail)
+        job = Task.objects.get(name='posts.tasks.generate_thumbnail')
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertIn('битый', job.last_error)
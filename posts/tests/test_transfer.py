@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts import search
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=self.reader, author=self.author)
+        for number in range(5):
+            post = Post.objects.create(
+                text='Пост про котов %s' % number,
+                author=self.author,
+                group=self.group if number % 2 else None,
+            )
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group__slug'
+            )),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'pk', 'post_id', 'author__username', 'text', 'created'
+            )),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        }
+
+    def wipe(self):
+        Follow.objects.all().delete()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def round_trip(self, *export_args):
+        before = self.snapshot()
+        call_command('export_data', *export_args, stderr=StringIO())
+        self.wipe()
+        call_command(
+            'import_data', export_args[0], '--batch-size', '3',
+            stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertEqual(self.snapshot(), before)
+
+    def test_ndjson_round_trip(self):
+        """Выгрузка и загрузка NDJSON сохраняют данные, id и даты."""
+        path = os.path.join(self.directory, 'dump.ndjson')
+        self.round_trip(path)
+        # Производные таблицы пересчитаны, хотя сигналы не срабатывали.
+        reader = User.objects.get(username='reader')
+        self.assertEqual(reader.stats.following_count, 1)
+        self.assertEqual(FeedEntry.objects.filter(user=reader).count(), 5)
+        self.assertEqual(len(search.search_posts('коты')), 5)
+
+    def test_csv_round_trip(self):
+        self.round_trip(os.path.join(self.directory, 'csv'), '--format', 'csv')
+
+    def test_resume_after_failure(self):
+        """После ошибки загрузка с --resume дописывает оставшееся."""
+        path = os.path.join(self.directory, 'broken.ndjson')
+        call_command('export_data', path, stderr=StringIO())
+        before = self.snapshot()
+        with open(path, encoding='utf-8') as source:
+            lines = source.readlines()
+        broken = lines[:8] + ['{"model": "post", "id": \n'] + lines[8:]
+        with open(path, 'w', encoding='utf-8') as out:
+            out.writelines(broken)
+        self.wipe()
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_data', path, '--batch-size', '3',
+                stdout=StringIO(), stderr=StringIO()
+            )
+        with open(f'{path}.progress', encoding='utf-8') as progress:
+            self.assertEqual(json.load(progress), {'broken.ndjson': 6})
+        # Записаны две пачки: группа и все пять постов.
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 0)
+
+        broken[8] = '\n'
+        with open(path, 'w', encoding='utf-8') as out:
+            out.writelines(broken)
+        call_command(
+            'import_data', path, '--resume', '--batch-size', '3',
+            stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertEqual(self.snapshot(), before)
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+    def test_conflicting_ids_stop_import(self):
+        """Пост с занятым чужой записью id не теряется молча."""
+        path = os.path.join(self.directory, 'conflict.ndjson')
+        call_command('export_data', path, stderr=StringIO())
+        taken = Post.objects.order_by('pk').first().pk
+        self.wipe()
+        other = User.objects.create_user(username='other')
+        local = Post.objects.create(id=taken, text='Свой пост', author=other)
+        with self.assertRaisesMessage(CommandError, 'уже занят'):
+            call_command(
+                'import_data', path, stdout=StringIO(), stderr=StringIO()
+            )
+        self.assertEqual(list(Post.objects.all()), [local])
+
+    def test_group_with_taken_id_gets_new_one(self):
+        path = os.path.join(self.directory, 'groups.ndjson')
+        call_command(
+            'export_data', path, '--models', 'group', stderr=StringIO()
+        )
+        self.wipe()
+        Group.objects.create(id=self.group.pk, title='Своя', slug='own')
+        call_command('import_data', path, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(
+            sorted(Group.objects.values_list('slug', flat=True)),
+            ['group', 'own'],
+        )
@@ -0,0 +1,96 @@
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Post, TrendingScore, User
+from tasks.models import Task
+from tasks.queue import run_pending
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.fresh = Post.objects.create(text='Свежий', author=cls.user)
+        cls.old = Post.objects.create(text='Вчерашний', author=cls.user)
+        cls.quiet = Post.objects.create(text='Тихий', author=cls.user)
+
+    def comment(self, post, age=0):
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        created = timezone.now() - timedelta(seconds=age)
+        Comment.objects.filter(pk=comment.pk).update(created=created)
+        return comment
+
+    def test_recent_comment_outweighs_older_ones(self):
+        """Три комментария двух полупериодов назад легче одного свежего."""
+        self.comment(self.fresh)
+        for _ in range(3):
+            self.comment(self.old, age=2 * settings.TRENDING_HALF_LIFE)
+        self.assertEqual(trending.update(), 2)
+        self.assertEqual(list(trending.top()), [self.fresh, self.old])
+        self.assertEqual(self.old.trending.comment_count, 3)
+
+    def test_update_refreshes_only_posts_with_new_comments(self):
+        self.comment(self.fresh)
+        trending.update()
+        self.comment(self.old)
+        self.assertEqual(trending.update(), 1)
+        self.assertEqual(trending.update(), 0)
+
+    def test_score_is_independent_of_update_order(self):
+        """Пересчёт по частям даёт те же очки, что и с нуля."""
+        self.comment(self.fresh, age=3600)
+        trending.update()
+        self.comment(self.fresh)
+        trending.update()
+        partial = TrendingScore.objects.get(post=self.fresh).score
+        trending.rebuild()
+        rebuilt = TrendingScore.objects.get(post=self.fresh).score
+        self.assertAlmostEqual(partial, rebuilt)
+
+    def test_stale_posts_drop_out(self):
+        self.comment(self.old, age=settings.TRENDING_MAX_AGE + 60)
+        self.comment(self.fresh)
+        trending.update()
+        self.assertEqual(list(trending.top()), [self.fresh])
+        self.assertFalse(TrendingScore.objects.filter(post=self.old).exists())
+
+    def test_deleted_comment_refreshes_score(self):
+        comment = self.comment(self.quiet)
+        trending.update()
+        comment.delete()
+        run_pending()
+        self.assertFalse(
+            TrendingScore.objects.filter(post=self.quiet).exists()
+        )
+
+    def test_new_comment_queues_single_update(self):
+        client = Client()
+        client.force_login(self.user)
+        for _ in range(2):
+            client.post(
+                reverse('add_comment', args=['reader', self.quiet.pk]),
+                {'text': 'Обсуждаем'}
+            )
+        name = 'posts.tasks.update_trending'
+        self.assertEqual(Task.objects.filter(name=name).count(), 1)
+        run_pending()
+        self.assertEqual(self.quiet.trending.comment_count, 2)
+
+    def test_trending_page_reads_ranked_table(self):
+        self.comment(self.fresh)
+        call_command('update_trending', stdout=io.StringIO())
+        with self.assertNumQueries(1):
+            posts = list(trending.top())
+        self.assertEqual(posts, [self.fresh])
+        response = Client().get(reverse('trending'))
+        self.assertContains(response, 'Свежий')
+        self.assertNotContains(response, 'Тихий')
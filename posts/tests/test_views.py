@@ -351,21 +351,207 @@ class CacheTests(TestCase):
             author=cls.user,
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_cache_index_page(self):
-        """Посты страницы Index хранятся в cash и
-        обновляются каждые 20 сек"""
+        """Посты страницы Index хранятся в кеше до записи,
+        новая запись сбрасывает фрагмент."""
         response = self.authorized_client.get(reverse('index'))
         content_one = response.content
+        # update() не шлёт сигналов: версия ленты не меняется.
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        response = self.authorized_client.get(reverse('index'))
+        content_plus = response.content
+        self.assertEqual(content_one, content_plus, 'Caching is working.')
+
         Post.objects.create(
             text='Тестовый текст 2',
             author=self.user
         )
         response = self.authorized_client.get(reverse('index'))
-        content_plus = response.content
-        self.assertEqual(content_one, content_plus, 'Caching is working.')
+        content_two = response.content
+        self.assertNotEqual(content_plus, content_two, 'Caching is reset.')
+        self.assertContains(response, 'Тестовый текст 2')
+
+    def test_cache_is_keyed_by_page(self):
+        """Вторая страница не получает HTML первой."""
+        for number in range(10):
+            Post.objects.create(text='Пост %s' % number, author=self.user)
+        first = self.authorized_client.get(reverse('index'))
+        second = self.authorized_client.get(
+            reverse('index') + f'?cursor={first.context["page"].next_cursor}'
+        )
+        self.assertContains(second, 'Тестовый текст')
+        self.assertNotContains(first, 'Тестовый текст')
 
-        cache.clear()
+    def test_cache_does_not_leak_edit_button(self):
+        """Кнопка «Редактировать» из кеша не видна другим."""
+        edit_url = reverse('post_edit', args=[self.user, self.post.pk])
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, edit_url)
+        other = User.objects.create_user(username='other')
+        other_client = Client()
+        other_client.force_login(other)
+        response = other_client.get(reverse('index'))
+        self.assertNotContains(response, edit_url)
+
+    def test_anonymous_page_is_cached_whole(self):
+        """Анонимная главная отдаётся из кеша до новой записи."""
+        guest_client = Client()
+        response = guest_client.get(reverse('index'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        with self.assertNumQueries(0):
+            cached = guest_client.get(reverse('index'))
+        self.assertEqual(cached.content, response.content)
+
+        not_modified = guest_client.get(
+            reverse('index'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
 
+        Post.objects.create(text='Тестовый текст 2', author=self.user)
+        response = guest_client.get(
+            reverse('index'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertContains(response, 'Тестовый текст 2')
+
+    def test_anonymous_page_ignores_unused_params(self):
+        """Метки в URL не плодят копий страницы в кеше."""
+        guest_client = Client()
+        response = guest_client.get(reverse('index'))
+        for query in ('?utm_source=mail', '?x=1&fbclid=abc'):
+            with self.subTest(query=query):
+                with self.assertNumQueries(0):
+                    cached = guest_client.get(reverse('index') + query)
+                self.assertEqual(cached['ETag'], response['ETag'])
+        paged = guest_client.get(reverse('index') + '?page=2&utm_source=x')
+        self.assertNotEqual(paged['ETag'], response['ETag'])
+
+    def test_authorized_page_is_private(self):
         response = self.authorized_client.get(reverse('index'))
-        content_two = response.content
-        self.assertNotEqual(content_plus, content_two, 'Caching is clear.')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Andr')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            slug='Test',
+            description='Что то о группе'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for number in range(10):
+            post = Post.objects.create(
+                text='Текст %s' % number,
+                author=cls.user,
+                group=cls.group
+            )
+            post.comments.create(author=cls.reader, text='Коментарий')
+            post.comments.create(author=cls.user, text='Ответ')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_render_with_fixed_number_of_queries(self):
+        """Лента рендерится фиксированным числом запросов."""
+        # Группе нужен ещё запрос id по slug для ключа кеша страницы.
+        pages = {
+            reverse('index'): 1,
+            reverse('group_posts', kwargs={'slug': self.group.slug}): 3,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(url)
+
+    def test_follow_feed_renders_with_fixed_number_of_queries(self):
+        """Лента подписок не делает запросов на каждый пост."""
+        # Сессия, пользователь, популярные авторы, ключи ленты и посты.
+        with self.assertNumQueries(5):
+            response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual(len(response.context['page']), 10)
+
+    def test_follow_feed_pages_by_cursor(self):
+        """Лента подписок листается курсором без подсчёта постов."""
+        Post.objects.create(text='Ещё текст', author=self.user)
+        with self.assertNumQueries(5):
+            response = self.reader_client.get(reverse('follow_index'))
+        page = response.context['page']
+        self.assertContains(response, '?cursor=%s' % page.next_cursor)
+        response = self.reader_client.get(
+            reverse('follow_index'), {'cursor': page.next_cursor}
+        )
+        self.assertEqual(len(response.context['page']), 1)
+
+    def test_feed_annotates_comment_count(self):
+        """Число комментариев приходит аннотацией."""
+        response = self.guest_client.get(reverse('index'))
+        self.assertEqual(response.context['page'][0].comment_count, 2)
+        self.assertContains(response, 'Комментариев: 2', count=10)
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Andr')
+        cls.post = Post.objects.create(text='Текст', author=cls.user)
+        for number in range(45):
+            cls.post.comments.create(
+                author=cls.user, text='Коментарий %s' % number
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.post_url = reverse('post', args=['Andr', self.post.id])
+        self.comments_url = reverse(
+            'post_comments', args=['Andr', self.post.id]
+        )
+
+    def test_post_page_shows_first_comments(self):
+        """На странице поста только первая страница комментариев."""
+        # Пост с автором и его счётчиками, затем страница комментариев.
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(self.post_url)
+        page = response.context['comments_page']
+        self.assertEqual(len(page), 20)
+        self.assertEqual(page[0].text, 'Коментарий 44')
+        self.assertNotIn('comments', response.context)
+        self.assertContains(response, 'Показать ещё комментарии')
+
+    def test_comment_pages_cover_all_comments_once(self):
+        """Фрагменты по курсору отдают все комментарии без повторов."""
+        seen = []
+        page = self.guest_client.get(self.post_url).context['comments_page']
+        seen.extend(comment.pk for comment in page)
+        while page.has_next():
+            response = self.guest_client.get(
+                self.comments_url, {'cursor': page.next_cursor}
+            )
+            self.assertTemplateUsed(response, 'include/comment_list.html')
+            page = response.context['comments_page']
+            seen.extend(comment.pk for comment in page)
+        self.assertEqual(
+            seen,
+            list(self.post.comments.order_by('-created', '-pk')
+                 .values_list('pk', flat=True))
+        )
+
+    def test_comments_json(self):
+        response = self.guest_client.get(self.comments_url, {'format': 'json'})
+        data = response.json()
+        self.assertEqual(len(data['comments']), 20)
+        self.assertEqual(data['comments'][0]['author'], 'Andr')
+        response = self.guest_client.get(data['next'] + '&format=json')
+        self.assertEqual(len(response.json()['comments']), 20)
@@ -0,0 +1,19 @@
+"""Миниатюры постов, подготовленные при сохранении.
+
+Шаблоны берут готовый post.thumbnail_url и не вызывают Pillow и
+хранилище ключей sorl во время запроса. Ошибки Pillow и хранилища не
+перехватываются: задачу generate_thumbnail повторит очередь.
+"""
+from sorl.thumbnail import get_thumbnail
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def generate(post):
+    name = ''
+    if post.image:
+        name = get_thumbnail(post.image, GEOMETRY, **OPTIONS).name
+    if name != post.thumbnail:
+        post.thumbnail = name
+        post.save(update_fields=['thumbnail'])
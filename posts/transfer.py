@@ -0,0 +1,364 @@
+"""Выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Строки читаются iterator() пачками и пишутся потоком в NDJSON (одна
+запись на строку, с полем model) или в CSV (файл на модель), поэтому
+память не растёт с объёмом данных. Пользователи и группы в строках
+указываются по username и slug, посты и комментарии сохраняют свои id.
+
+Загрузка копит строки пачками и пишет их bulk_create в одной транзакции
+на пачку, после чего отмечает в файле прогресса, сколько строк каждого
+источника уже загружено. После сбоя загрузка с --resume продолжит с
+этого места, а повтор уже записанных строк пропускается по ключам. Если
+id поста, комментария или группы в базе занят другой записью, загрузка
+останавливается с ошибкой, а не теряет строку молча.
+bulk_create не шлёт сигналов, поэтому в конце пересчитываются UserStats,
+ленты, поисковый индекс и популярное и очищается кеш.
+"""
+import csv
+import json
+import os
+
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import feed, search, stats, trending
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 2000
+# SQLite ограничивает число параметров запроса.
+LOOKUP_CHUNK = 500
+
+MODELS = ('group', 'post', 'comment', 'follow')
+
+FIELDS = {
+    'group': ('id', 'title', 'slug', 'description'),
+    'post': ('id', 'text', 'pub_date', 'author', 'group', 'image'),
+    'comment': ('id', 'post', 'author', 'text', 'created'),
+    'follow': ('user', 'author'),
+}
+
+SOURCES = {
+    'group': (Group, ('id', 'title', 'slug', 'description')),
+    'post': (Post, (
+        'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image'
+    )),
+    'comment': (Comment, (
+        'id', 'post_id', 'author__username', 'text', 'created'
+    )),
+    'follow': (Follow, ('user__username', 'author__username')),
+}
+
+
+def export_rows(name, batch_size=BATCH_SIZE):
+    model, lookups = SOURCES[name]
+    rows = model.objects.order_by('pk').values_list(*lookups)
+    for row in rows.iterator(chunk_size=batch_size):
+        yield dict(zip(FIELDS[name], row))
+
+
+def _json_value(value):
+    # DjangoJSONEncoder обрезает микросекунды, а они нужны курсорам лент.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_ndjson(out, names, batch_size=BATCH_SIZE, progress=None):
+    for name in names:
+        written = 0
+        for row in export_rows(name, batch_size):
+            row['model'] = name
+            out.write(json.dumps(row, default=_json_value,
+                                 ensure_ascii=False))
+            out.write('\n')
+            written += 1
+            if progress and written % batch_size == 0:
+                progress(name, written)
+        if progress:
+            progress(name, written)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def write_csv(directory, names, batch_size=BATCH_SIZE, progress=None):
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        path = os.path.join(directory, f'{name}.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out)
+            writer.writerow(FIELDS[name])
+            written = 0
+            for row in export_rows(name, batch_size):
+                writer.writerow([_csv_value(value) for value in row.values()])
+                written += 1
+                if progress and written % batch_size == 0:
+                    progress(name, written)
+        if progress:
+            progress(name, written)
+
+
+def read_ndjson(path):
+    """(источник, номер строки, модель, строка) из файла NDJSON."""
+    with open(path, encoding='utf-8') as source:
+        for number, line in enumerate(source, 1):
+            if line.strip():
+                row = json.loads(line)
+                yield path, number, row.pop('model'), row
+            else:
+                yield path, number, None, None
+
+
+def read_csv(directory):
+    for name in MODELS:
+        path = os.path.join(directory, f'{name}.csv')
+        if not os.path.exists(path):
+            continue
+        with open(path, newline='', encoding='utf-8') as source:
+            for number, row in enumerate(csv.DictReader(source), 1):
+                yield path, number, name, {
+                    key: value if value != '' else None
+                    for key, value in row.items()
+                }
+
+
+class Checkpoint:
+    """Сколько строк каждого источника уже записано в базу."""
+
+    def __init__(self, path, resume):
+        self.path = path
+        self.done = {}
+        if resume and os.path.exists(path):
+            with open(path, encoding='utf-8') as saved:
+                self.done = json.load(saved)
+
+    def skip(self, source, number):
+        return number <= self.done.get(os.path.basename(source), 0)
+
+    def save(self, positions):
+        for source, number in positions.items():
+            self.done[os.path.basename(source)] = number
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as out:
+            json.dump(self.done, out)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _chunks(values, size=LOOKUP_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _date(value):
+    return parse_datetime(value) if isinstance(value, str) else value
+
+
+# Поля auto_now_add: при вставке их значение заменяется текущим временем.
+DATE_FIELDS = {Post: 'pub_date', Comment: 'created'}
+
+
+def bulk_create_dated(model, objects):
+    """bulk_create с ignore_conflicts, сохраняющий даты из самих объектов.
+
+    Дату, заменённую auto_now_add, возвращает bulk_update в той же
+    транзакции, так что поле модели для других потоков не меняется.
+    """
+    objects = list(objects)
+    field = DATE_FIELDS.get(model)
+    dates = [getattr(obj, field) for obj in objects] if field else []
+    model.objects.bulk_create(objects, ignore_conflicts=True)
+    if field and objects:
+        for obj, date in zip(objects, dates):
+            setattr(obj, field, date)
+        model.objects.bulk_update(objects, [field], batch_size=LOOKUP_CHUNK)
+
+
+def check_conflicts(model, objects, fields):
+    """Ошибка, если id занят в базе записью с другими fields.
+
+    Та же запись - повтор после --resume, её bulk_create пропустит.
+    """
+    incoming = {obj.pk: obj for obj in objects}
+    for chunk in _chunks(incoming):
+        rows = model.objects.filter(pk__in=chunk).values_list('pk', *fields)
+        for pk, *values in rows:
+            obj = incoming[pk]
+            if [getattr(obj, name) for name in fields] != values:
+                raise ValueError(
+                    f'{model._meta.model_name} id={pk} уже занят другой '
+                    f'записью'
+                )
+
+
+class Importer:
+    def __init__(self, checkpoint, batch_size=BATCH_SIZE, progress=None):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.progress = progress
+        self.buffers = {name: [] for name in MODELS}
+        self.positions = {}
+        self.pending = 0
+        self.counts = dict.fromkeys(MODELS, 0)
+        self.skipped = 0
+
+    def load(self, rows):
+        for source, number, name, row in rows:
+            if self.checkpoint.skip(source, number):
+                continue
+            if name is not None:
+                if name not in self.buffers:
+                    raise ValueError(
+                        f'{source}:{number}: неизвестная модель {name}'
+                    )
+                self.buffers[name].append(row)
+                self.pending += 1
+            self.positions[source] = number
+            if self.pending >= self.batch_size:
+                self.flush()
+        self.flush()
+        return self.counts
+
+    def flush(self):
+        if self.pending:
+            with transaction.atomic():
+                users = self._users()
+                groups = self._groups()
+                for name in MODELS:
+                    rows, self.buffers[name] = self.buffers[name], []
+                    if rows:
+                        getattr(self, f'_insert_{name}')(rows, users, groups)
+                        self.counts[name] += len(rows)
+            self.pending = 0
+        if self.positions:
+            self.checkpoint.save(self.positions)
+            if self.progress:
+                self.progress(self.counts)
+
+    def _users(self):
+        names = set()
+        for row in self.buffers['post'] + self.buffers['comment']:
+            names.add(row['author'])
+        for row in self.buffers['follow']:
+            names.update((row['user'], row['author']))
+        names.discard(None)
+        found = {}
+        for chunk in _chunks(names):
+            found.update(User.objects.filter(
+                username__in=chunk
+            ).values_list('username', 'pk'))
+        missing = names - set(found)
+        if missing:
+            # Авторы из другой сети: учётные записи без пароля.
+            User.objects.bulk_create(
+                [User(username=name, password='!') for name in missing],
+                ignore_conflicts=True,
+            )
+            for chunk in _chunks(missing):
+                found.update(User.objects.filter(
+                    username__in=chunk
+                ).values_list('username', 'pk'))
+        return found
+
+    def _groups(self):
+        slugs = {row['group'] for row in self.buffers['post']} - {None}
+        found = {}
+        for chunk in _chunks(slugs):
+            found.update(Group.objects.filter(
+                slug__in=chunk
+            ).values_list('slug', 'pk'))
+        return found
+
+    def _insert_group(self, rows, users, groups):
+        objects = [
+            Group(
+                id=int(row['id']), title=row['title'], slug=row['slug'],
+                description=row['description'] or '',
+            )
+            for row in rows
+        ]
+        # Посты ссылаются на группу по slug, поэтому id, занятый другой
+        # группой, не сохраняется: группа получит новый.
+        taken = {}
+        for chunk in _chunks(group.pk for group in objects):
+            taken.update(
+                Group.objects.filter(pk__in=chunk).values_list('pk', 'slug')
+            )
+        for group in objects:
+            if taken.get(group.pk, group.slug) != group.slug:
+                group.id = None
+        bulk_create_dated(Group, objects)
+
+    def _insert_post(self, rows, users, groups):
+        # Группы этой же пачки уже записаны: дочитываем их slug.
+        slugs = {row['group'] for row in rows} - {None} - set(groups)
+        for chunk in _chunks(slugs):
+            groups.update(Group.objects.filter(
+                slug__in=chunk
+            ).values_list('slug', 'pk'))
+        objects = [
+            Post(
+                id=int(row['id']), text=row['text'],
+                pub_date=_date(row['pub_date']),
+                author_id=users.get(row['author']),
+                group_id=groups.get(row['group']),
+                image=row['image'] or None,
+            )
+            for row in rows
+        ]
+        check_conflicts(Post, objects, ['author_id', 'pub_date'])
+        bulk_create_dated(Post, objects)
+
+    def _insert_comment(self, rows, users, groups):
+        existing = set()
+        for chunk in _chunks({int(row['post']) for row in rows}):
+            existing.update(
+                Post.objects.filter(pk__in=chunk).values_list('pk', flat=True)
+            )
+        comments = [
+            Comment(
+                id=int(row['id']), post_id=int(row['post']),
+                author_id=users[row['author']], text=row['text'],
+                created=_date(row['created']),
+            )
+            for row in rows if int(row['post']) in existing
+        ]
+        self.skipped += len(rows) - len(comments)
+        check_conflicts(Comment, comments, ['post_id', 'author_id', 'created'])
+        bulk_create_dated(Comment, comments)
+
+    def _insert_follow(self, rows, users, groups):
+        Follow.objects.bulk_create([
+            Follow(user_id=users[row['user']], author_id=users[row['author']])
+            for row in rows if row['user'] != row['author']
+        ], ignore_conflicts=True)
+
+
+def finish():
+    """Всё, что при обычной записи делают сигналы.
+
+    Каждый пересчёт - своя транзакция (поиск - по транзакции на пачку),
+    чтобы не держать запись в базе на всё время пересчёта.
+    """
+    sequences = connection.ops.sequence_reset_sql(
+        no_style(), [Group, Post, Comment]
+    )
+    with connection.cursor() as cursor:
+        for sql in sequences:
+            cursor.execute(sql)
+    stats.rebuild()
+    with transaction.atomic():
+        feed.rebuild()
+    search.rebuild()
+    with transaction.atomic():
+        trending.rebuild()
+    cache.clear()
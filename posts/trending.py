@@ -0,0 +1,119 @@
+"""Популярные посты по недавним комментариям.
+
+Каждый комментарий весит 2 ** ((created - EPOCH) / TRENDING_HALF_LIFE):
+вес свежего комментария вдвое больше, чем у написанного полупериод
+назад. Все веса со временем убывают одинаково, поэтому порядок постов
+можно считать от постоянной точки EPOCH и не пересчитывать каждую
+минуту. Сами веса быстро переполняют float, поэтому в TrendingScore
+хранится их логарифм, а сумма считается через logsumexp.
+
+update() берёт комментарии новее водяного знака (наибольший
+last_comment_id в таблице) и заново считает очки только их постов.
+Пересчёт поста идемпотентен, так что повтор или сбитый водяной знак
+дают лишнюю работу, но не двойной счёт. Страница /trending/ читает
+готовую таблицу по индексу очков.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Comment, Post, TrendingScore
+
+EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+BATCH_SIZE = 500
+
+
+def weight(moment):
+    """Логарифм веса комментария, написанного в moment."""
+    seconds = (moment - EPOCH).total_seconds()
+    return seconds / settings.TRENDING_HALF_LIFE * math.log(2)
+
+
+def logsumexp(values):
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def cutoff(now=None):
+    """Меньше этого очков у постов без комментариев за TRENDING_MAX_AGE."""
+    now = now or timezone.now()
+    return weight(now - timedelta(seconds=settings.TRENDING_MAX_AGE))
+
+
+def _chunks(values, size=BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def refresh(post_ids, now=None):
+    """Заново считает очки постов по их комментариям за TRENDING_MAX_AGE."""
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_MAX_AGE)
+    refreshed = 0
+    for chunk in _chunks(post_ids):
+        scores = {}
+        comments = Comment.objects.filter(
+            post_id__in=chunk, created__gte=since
+        ).values_list('post_id', 'pk', 'created')
+        for post_id, pk, created in comments.iterator():
+            weights, last = scores.get(post_id, ([], 0))
+            weights.append(weight(created))
+            scores[post_id] = (weights, max(last, pk))
+        with transaction.atomic():
+            TrendingScore.objects.filter(post_id__in=chunk).exclude(
+                post_id__in=list(scores)
+            ).delete()
+            existing = set(TrendingScore.objects.filter(
+                post_id__in=list(scores)
+            ).values_list('post_id', flat=True))
+            rows = [
+                TrendingScore(
+                    post_id=post_id, score=logsumexp(weights),
+                    comment_count=len(weights), last_comment_id=last,
+                )
+                for post_id, (weights, last) in scores.items()
+            ]
+            TrendingScore.objects.bulk_update(
+                [row for row in rows if row.post_id in existing],
+                ['score', 'comment_count', 'last_comment_id'],
+            )
+            TrendingScore.objects.bulk_create(
+                [row for row in rows if row.post_id not in existing]
+            )
+        refreshed += len(scores)
+    return refreshed
+
+
+def watermark():
+    latest = TrendingScore.objects.aggregate(latest=Max('last_comment_id'))
+    return latest['latest'] or 0
+
+
+def update(now=None):
+    """Пересчитывает посты с новыми комментариями; возвращает их число."""
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_MAX_AGE)
+    active = Comment.objects.filter(
+        pk__gt=watermark(), created__gte=since
+    ).order_by().values_list('post_id', flat=True).distinct()
+    refreshed = refresh(active, now)
+    TrendingScore.objects.filter(score__lt=cutoff(now)).delete()
+    return refreshed
+
+
+def rebuild(now=None):
+    TrendingScore.objects.all().delete()
+    return update(now)
+
+
+def top(limit=None):
+    """Самые обсуждаемые посты одним запросом по индексу очков."""
+    limit = limit or settings.TRENDING_SIZE
+    return Post.objects.for_feed().filter(
+        trending__score__gte=cutoff()
+    ).order_by('-trending__score', '-trending__post')[:limit]
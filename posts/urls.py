@@ -7,6 +7,9 @@ urlpatterns = [
     path("new/", views.new_post, name="new_post"),
     path("follow/", views.follow_index, name="follow_index"),
     path("group/<slug:slug>/", views.group_posts, name="group_posts"),
+    path("trending/", views.trending_posts, name="trending"),
+    path("events/", views.post_events, name="post_events"),
+    path("search/", views.search, name="search"),
     path("<str:username>/", views.profile, name="profile"),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
     path(
@@ -14,10 +17,17 @@ urlpatterns = [
         views.post_edit,
         name="post_edit"
     ),
+    path(
+        "<str:username>/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments"
+    ),
     path("<username>/<int:post_id>/comment",
          views.add_comment,
          name="add_comment"
          ),
+    path("<str:username>/export/", views.profile_export,
+         name="profile_export"),
     path("<str:username>/follow/", views.profile_follow,
          name="profile_follow"),
     path("<str:username>/unfollow/", views.profile_unfollow,
@@ -1,9 +1,28 @@
+import re
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+
+from yatube.parallel import gather
+from yatube.routers import replica_reads
+from yatube.sqlite3 import serialized
 
+from . import (
+    cache, events, export, feed, search as post_search, tasks, trending,
+)
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from .paginator import CursorPaginator, plain_page
+from .models import Comment, Post, Group, User, Follow
+from .stats import get_stats
+
+COMMENTS_PER_PAGE = 20
+# id поста от клиента (Last-Event-ID, since_id): ASCII-цифры в int64.
+EVENT_ID = re.compile(r'[0-9]{1,18}')
 
 
 def page_not_found(request, exception):
@@ -19,83 +38,172 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+@replica_reads
+@cache.anonymous_page(lambda request: [cache.INDEX])
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
-        request,
-        'index.html',
-        {'page': page}
+    post_list = Post.objects.for_feed()
+    paginator = CursorPaginator(post_list, 10)
+    page = paginator.get_page(
+        request.GET.get('cursor'),
+        request.GET.get('page')
     )
+    context = {
+        'page': page,
+        'live_updates': settings.EVENTS_ENABLED,
+        **cache.fragment_context(request, page, cache.INDEX),
+    }
+    return render(request, 'index.html', context)
+
+
+def _group_namespaces(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+    return [cache.group(group_id)]
+
+
+def _profile_namespaces(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    return [cache.profile(author_id)]
 
 
+@replica_reads
+@cache.anonymous_page(_group_namespaces)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = group.posts.for_feed()
+    paginator = CursorPaginator(posts, 10)
+    page = paginator.get_page(
+        request.GET.get('cursor'),
+        request.GET.get('page')
+    )
     context = {
         'group': group,
         'posts': posts,
         'page': page,
+        'live_updates': settings.EVENTS_ENABLED,
+        **cache.fragment_context(request, page, cache.group(group.pk)),
     }
     return render(request, 'group.html', context)
 
 
+def post_events(request):
+    """Новые посты ленты потоком text/event-stream."""
+    if not settings.EVENTS_ENABLED:
+        raise Http404
+    try:
+        spec = feed.resolve(request.GET, request.user)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    last_id = (
+        request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('since')
+    )
+    if last_id is not None and not EVENT_ID.fullmatch(last_id):
+        return HttpResponseBadRequest('Неверный id поста')
+    response = StreamingHttpResponse(
+        events.stream(spec, int(last_id) if last_id else None),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен копить поток в буфере.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def trending_posts(request):
+    return render(request, 'trending.html', {'posts': trending.top()})
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'results': post_search.search_posts(query) if query else [],
+    }
+    return render(request, 'search.html', context)
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with serialized():
+            post.save()
+            if post.image:
+                tasks.generate_thumbnail.delay(post.pk)
         return redirect('index')
     return render(request, 'new.html', {'form': form})
 
 
+@replica_reads
+@cache.anonymous_page(_profile_namespaces)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    number_posts = author.posts.count()
-    is_following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author).exists()
-    following = author.follower.count()
-    followers = author.following.count()
-    paginator = Paginator(posts, 5)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    # Автор, страница постов и подписка ищутся по username независимо.
+    posts = Post.objects.filter(author__username=username).for_feed()
+    paginator = CursorPaginator(posts, 5)
+    user = request.user
+    author, page, is_following = gather(
+        lambda: get_object_or_404(
+            User.objects.select_related('stats'),
+            username=username
+        ),
+        lambda: paginator.get_page(
+            request.GET.get('cursor'),
+            request.GET.get('page')
+        ),
+        lambda: user.is_authenticated and Follow.objects.filter(
+            user=user,
+            author__username=username).exists(),
+    )
+    stats = get_stats(author)
     context = {
         'author': author,
         'posts': posts,
         'page': page,
-        'number_posts': number_posts,
+        **cache.fragment_context(request, page, cache.profile(author.pk)),
+        'number_posts': stats.post_count,
         'is_following': is_following,
-        'following': following,
-        'followers': followers
+        'following': stats.following_count,
+        'followers': stats.follower_count
     }
     return render(request, 'profile.html', context)
 
 
+def comments_page(request, comments):
+    """Страница комментариев от новых к старым по курсору (created, id)."""
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, ordering=('created', 'pk')
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
 def post_view(request, username, post_id):
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    comments = post.comments.all()
+    comments = Comment.objects.filter(
+        post_id=post_id
+    ).select_related('author')
+    post, page = gather(
+        lambda: get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            id=post_id,
+            author__username=username
+        ),
+        lambda: comments_page(request, comments),
+    )
     author = post.author
-    number_posts = author.posts.count()
-    following = author.follower.count()
-    followers = author.following.count()
+    stats = get_stats(author)
     context = {
         'author': author,
         'post': post,
         'form': form,
-        'comments': comments,
-        'number_posts': number_posts,
-        'following': following,
-        'followers': followers
+        'comments_page': page,
+        'number_posts': stats.post_count,
+        'following': stats.following_count,
+        'followers': stats.follower_count
     }
     return render(request, 'post.html', context)
 
@@ -111,7 +219,14 @@ def post_edit(request, username, post_id):
         return redirect('post', username=username, post_id=post.id)
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            new_image = 'image' in form.changed_data
+            if new_image:
+                # Миниатюра прежней картинки до готовности новой не нужна.
+                post.thumbnail = ''
+            with serialized():
+                form.save()
+                if new_image:
+                    tasks.generate_thumbnail.delay(post.pk)
             return redirect('post', username=username, post_id=post.id)
     return render(
         request, 'new.html',
@@ -119,6 +234,39 @@ def post_edit(request, username, post_id):
     )
 
 
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        id=post_id,
+        author__username=username
+    )
+    page = comments_page(request, post.comments.select_related('author'))
+    next_url = None
+    if page.has_next():
+        next_url = '{}?cursor={}'.format(
+            reverse('post_comments', args=[username, post_id]),
+            page.next_cursor
+        )
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in page
+            ],
+            'next': next_url,
+        })
+    return render(
+        request, 'include/comment_list.html',
+        {'post': post, 'comments_page': page}
+    )
+
+
 @login_required
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
@@ -128,36 +276,67 @@ def add_comment(request, username, post_id):
             comment = form.save(commit=False)
             comment.author = request.user
             comment.post = post
-            comment.save()
+            with serialized():
+                comment.save()
+                tasks.update_trending.delay()
             return redirect('post', username, post_id)
     return render(
         request, 'include/comments.html', {'form': form, 'post': post}
     )
 
 
+@replica_reads
 @login_required
 def follow_index(request):
     current_user = request.user
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
-        request, 'follow.html',
-        {'page': page, 'paginator': paginator, 'user': current_user}
+    pulled = list(feed.pulled_authors(current_user))
+    page = feed.FollowPaginator(current_user, 10, pulled).get_page(
+        request.GET.get('cursor'),
+        request.GET.get('page')
     )
+    paginator, plain = plain_page(
+        page, feed.follow_feed(current_user, pulled).for_feed()
+    )
+    context = {
+        'page': plain,
+        'paginator': paginator,
+        'user': current_user,
+        'live_updates': settings.EVENTS_ENABLED,
+        **cache.fragment_context(
+            request, page, *feed.follow_namespaces(current_user, pulled)
+        ),
+    }
+    return render(request, 'follow.html', context)
+
+
+@login_required
+def profile_export(request, username):
+    """Все посты и комментарии пользователя одним потоковым файлом."""
+    if request.user.username != username:
+        raise Http404
+    if request.GET.get('format') == 'zip':
+        response = StreamingHttpResponse(
+            export.zip_archive(request.user), content_type='application/zip'
+        )
+        filename = f'{username}.zip'
+    else:
+        response = StreamingHttpResponse(
+            export.ndjson(request.user), content_type='application/x-ndjson'
+        )
+        filename = f'{username}.ndjson'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 @login_required
 def profile_follow(request, username):
     profile = get_object_or_404(User, username=username)
     if request.user != profile:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=profile
-        )
+        with serialized():
+            Follow.objects.get_or_create(
+                user=request.user,
+                author=profile
+            )
 
     return redirect('profile', username=username)
 
@@ -165,9 +344,10 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     unfollow_user = get_object_or_404(User, username=username)
-    get_object_or_404(
-        Follow,
-        user=request.user,
-        author=unfollow_user
-    ).delete()
+    with serialized():
+        get_object_or_404(
+            Follow,
+            user=request.user,
+            author=unfollow_user
+        ).delete()
     return redirect('profile', username=username)
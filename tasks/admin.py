@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "status", "attempts", "run_after")
+    search_fields = ("name",)
+    list_filter = ("status",)
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tasks.queue import prune, run_pending, worker_name
+
+
+class Command(BaseCommand):
+    help = "Запускает воркер фоновых задач"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help="Число потоков, выполняющих задачи"
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help="Пауза в секундах, когда очередь пуста"
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help="Выполнить готовые задачи и завершиться"
+        )
+
+    def handle(self, *args, **options):
+        threads = [
+            threading.Thread(
+                target=self.loop,
+                args=(options['poll_interval'], options['burst']),
+                daemon=True,
+            )
+            for _ in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Воркер остановлен")
+
+    def loop(self, poll_interval, burst):
+        name = worker_name()
+        try:
+            while True:
+                done = run_pending(name)
+                if done:
+                    self.stdout.write(f"{name}: выполнено задач {done}")
+                    continue
+                prune()
+                if burst:
+                    return
+                time.sleep(poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,175 @@
+"""Очередь фоновых задач в основной базе данных.
+
+Задача объявляется декоратором @task в модуле tasks.py приложения и
+ставится в очередь через .delay(). Строка Task пишется в той же
+транзакции, что и данные запроса, поэтому воркер увидит задачу только
+после COMMIT. Воркеры (manage.py run_tasks) забирают задачи условным
+UPDATE, так что одну задачу не выполнят два процесса сразу.
+
+Попытка засчитывается при захвате задачи, поэтому задача, которая
+роняет воркер, тоже исчерпает max_attempts. Выполненные задачи хранятся
+TASKS_KEEP_DONE секунд, затем prune() их удаляет.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from yatube.sqlite3 import serialized
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts, concurrency, unique):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.unique = unique
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        if settings.TASKS_EAGER:
+            # Как и у воркера, ошибка задачи не роняет того, кто её ставит.
+            try:
+                self.func(*args, **kwargs)
+            except Exception:
+                logger.exception('Задача %s завершилась ошибкой', self.name)
+            return None
+        encoded_args = json.dumps(args, cls=DjangoJSONEncoder)
+        encoded_kwargs = json.dumps(kwargs, cls=DjangoJSONEncoder)
+        if self.unique:
+            queued = Task.objects.filter(
+                name=self.name,
+                status=Task.QUEUED,
+                args=encoded_args,
+                kwargs=encoded_kwargs,
+            ).first()
+            if queued is not None:
+                return queued
+        return Task.objects.create(
+            name=self.name,
+            args=encoded_args,
+            kwargs=encoded_kwargs,
+            max_attempts=self.max_attempts,
+        )
+
+
+def task(max_attempts=3, concurrency=None, unique=False):
+    """Объявляет фоновую задачу.
+
+    concurrency ограничивает число одновременно выполняемых задач с этим
+    именем на всех воркерах, unique не ставит в очередь повтор с теми же
+    аргументами, пока предыдущая ещё ждёт.
+    """
+    def decorator(func):
+        task_function = TaskFunction(func, max_attempts, concurrency, unique)
+        _registry[task_function.name] = task_function
+        return task_function
+    return decorator
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def _requeue_stale():
+    """Возвращает в очередь задачи воркеров, которые не дожили до конца."""
+    expired = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=expired)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, locked_by='', locked_at=None,
+        last_error='Воркер не завершил задачу за TASKS_LOCK_TIMEOUT',
+    )
+    stale.update(status=Task.QUEUED, locked_by='', locked_at=None)
+
+
+def _at_limit(name):
+    task_function = _registry.get(name)
+    if task_function is None or task_function.concurrency is None:
+        return False
+    running = Task.objects.filter(name=name, status=Task.RUNNING).count()
+    return running >= task_function.concurrency
+
+
+def claim(worker, limit=10):
+    _requeue_stale()
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_after__lte=now
+    ).values_list('pk', 'name')[:limit]
+    for pk, name in candidates:
+        # Проверка лимита и захват - одна транзакция записи.
+        with serialized():
+            if _at_limit(name):
+                continue
+            claimed = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+                status=Task.RUNNING, locked_by=worker, locked_at=now,
+                attempts=F('attempts') + 1,
+            )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def prune():
+    """Удаляет выполненные задачи старше TASKS_KEEP_DONE секунд."""
+    expired = timezone.now() - timedelta(seconds=settings.TASKS_KEEP_DONE)
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE, run_after__lt=expired
+    ).delete()
+    return deleted
+
+
+def execute(job):
+    task_function = _registry.get(job.name)
+    try:
+        if task_function is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        task_function.func(*json.loads(job.args), **json.loads(job.kwargs))
+    except Exception:
+        job.last_error = traceback.format_exc()
+        logger.exception('Задача %s завершилась ошибкой', job)
+        if job.attempts < job.max_attempts:
+            job.status = Task.QUEUED
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Task.FAILED
+    else:
+        job.status = Task.DONE
+    job.locked_by = ''
+    job.locked_at = None
+    job.save()
+    return job
+
+
+def run_pending(worker=None, limit=None):
+    """Выполняет готовые задачи, пока они есть; возвращает их число."""
+    worker = worker or worker_name()
+    done = 0
+    while limit is None or done < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        execute(job)
+        done += 1
+        close_old_connections()
+    return done
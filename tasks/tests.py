@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Task
+from .queue import claim, prune, run_pending, task
+
+calls = []
+
+
+@task(max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise ValueError('сбой')
+
+
+@task(unique=True)
+def refresh(key):
+    calls.append(key)
+
+
+@task(concurrency=1)
+def single():
+    calls.append('single')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_and_worker_runs(self):
+        """Задача ждёт в очереди и выполняется воркером."""
+        job = record.delay('значение')
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertEqual(calls, [])
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.DONE)
+        self.assertEqual(calls, ['значение'])
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        """Упавшая задача повторяется с задержкой, затем помечается ошибкой."""
+        job = explode.delay()
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('ValueError', job.last_error)
+
+        Task.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_unique_task_is_queued_once(self):
+        """Повтор unique-задачи с теми же аргументами не ставится."""
+        refresh.delay(1)
+        refresh.delay(1)
+        refresh.delay(2)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_concurrency_limit(self):
+        """Лимит concurrency не даёт забрать вторую такую же задачу."""
+        single.delay()
+        single.delay()
+        self.assertIsNotNone(claim('worker-1'))
+        self.assertIsNone(claim('worker-2'))
+
+    def test_stale_lock_is_requeued(self):
+        """Задача умершего воркера возвращается в очередь."""
+        job = record.delay('снова')
+        Task.objects.filter(pk=job.pk).update(
+            status=Task.RUNNING,
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, ['снова'])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        """В режиме TASKS_EAGER задача выполняется сразу."""
+        record.delay('сразу')
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Task.objects.exists())
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertIsNone(explode.delay())
+
+    def test_stale_lock_counts_attempts(self):
+        """Задача, ронявшая воркер max_attempts раз, помечается ошибкой."""
+        job = record.delay('падает')
+        Task.objects.filter(pk=job.pk).update(
+            status=Task.RUNNING,
+            attempts=2,
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(run_pending(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(calls, [])
+
+    def test_claim_counts_attempt(self):
+        """Попытка засчитывается уже при захвате задачи."""
+        record.delay('раз')
+        self.assertEqual(claim('worker-1').attempts, 1)
+
+    @override_settings(TASKS_KEEP_DONE=60)
+    def test_prune_deletes_old_done_tasks(self):
+        """prune() удаляет только давно выполненные задачи."""
+        old = record.delay('старая')
+        record.delay('новая')
+        run_pending()
+        Task.objects.filter(pk=old.pk).update(
+            run_after=timezone.now() - timedelta(hours=1)
+        )
+        explode.delay()
+        self.assertEqual(prune(), 1)
+        self.assertEqual(Task.objects.count(), 2)
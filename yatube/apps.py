@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class YatubeConfig(AppConfig):
+    name = 'yatube'
+
+    def ready(self):
+        from . import metrics
+        metrics.install()
@@ -0,0 +1,235 @@
+"""Кеш в файле SQLite, общий для всех воркеров на узле.
+
+LocMemCache у каждого процесса gunicorn свой, поэтому воркеры греют кеш
+по отдельности и видят разные версии лент. Этот бэкенд хранит записи в
+одном файле в режиме WAL: читатели не блокируют писателя, а все процессы
+видят одни и те же ключи. Счётчики попаданий, промахов и вытеснений
+копятся в процессе и периодически сбрасываются в тот же файл, поэтому
+stats() показывает сумму по всем воркерам.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STAT_NAMES = ('hits', 'misses', 'sets', 'deletes', 'evictions')
+
+
+class SQLiteCache(BaseCache):
+    flush_every = 100
+    cull_check_every = 50
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = dict.fromkeys(STAT_NAMES, 0)
+        self._ops = 0
+        self._writes = 0
+
+    @property
+    def _db(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None,
+                check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS stats ('
+                'name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._pending[name] += amount
+            self._ops += 1
+            flush = self._ops >= self.flush_every
+        if flush:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._lock:
+            pending, self._pending = self._pending, dict.fromkeys(
+                STAT_NAMES, 0
+            )
+            self._ops = 0
+        self._db.executemany(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            [(name, value) for name, value in pending.items() if value]
+        )
+
+    def stats(self):
+        self._flush_stats()
+        totals = dict.fromkeys(STAT_NAMES, 0)
+        totals.update(self._db.execute('SELECT name, value FROM stats'))
+        totals['entries'] = self._db.execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        return totals
+
+    def _write(self, sql, key, value, timeout):
+        self._cull()
+        cursor = self._db.execute(sql, (
+            key,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            self.get_backend_timeout(timeout),
+        ))
+        return cursor.rowcount
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute(
+            'DELETE FROM cache WHERE key = ? AND expires <= ?',
+            (key, time.time())
+        )
+        added = self._write(
+            'INSERT OR IGNORE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            key, value, timeout
+        )
+        if added:
+            self._count('sets')
+        return bool(added)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = self._db.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        mapping = {self.make_key(key, version=version): key for key in keys}
+        for key in mapping:
+            self.validate_key(key)
+        found = {}
+        if mapping:
+            placeholders = ', '.join('?' * len(mapping))
+            rows = self._db.execute(
+                f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+                'AND (expires IS NULL OR expires > ?)',
+                (*mapping, time.time())
+            )
+            for key, value in rows:
+                found[mapping[key]] = pickle.loads(value)
+        self._count('hits', len(found))
+        self._count('misses', len(mapping) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            key, value, timeout
+        )
+        self._count('sets')
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._cull()
+        expires = self.get_backend_timeout(timeout)
+        rows = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            rows.append(
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+            )
+        self._db.executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            rows
+        )
+        self._count('sets', len(rows))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+        self._count('deletes')
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        self._db.executemany(
+            'DELETE FROM cache WHERE key = ?', [(key,) for key in keys]
+        )
+        self._count('deletes', len(keys))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _cull(self):
+        with self._lock:
+            self._writes += 1
+            if self._writes < self.cull_check_every:
+                return
+            self._writes = 0
+        db = self._db
+        expired = db.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        ).rowcount
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        evicted = 0
+        if count > self._max_entries and self._cull_frequency == 0:
+            evicted = db.execute('DELETE FROM cache').rowcount
+        elif count > self._max_entries:
+            # Вечные ключи (версии лент) вытесняются последними.
+            evicted = db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY expires IS NULL, expires '
+                'LIMIT ?)',
+                (max(count // self._cull_frequency, 1),)
+            ).rowcount
+        if expired or evicted:
+            self._count('evictions', expired + evicted)
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время работы потока, как у LocMemCache.
+        pass
@@ -0,0 +1,361 @@
+"""Метрики запросов: время ответа, SQL, шаблоны и кеш по имени URL.
+
+MetricsMiddleware замеряет долю METRICS_SAMPLE_RATE запросов: полное
+время, число и время SQL-запросов (execute_wrapper), время отрисовки
+шаблонов и попадания в кеш. Персонал смотрит на /metrics/ скользящие
+гистограммы за последние METRICS_WINDOW секунд по каждому имени URL.
+Скрейпер Prometheus получает на /metrics/prometheus/ (с заголовком
+Authorization: Bearer METRICS_TOKEN) счётчики, накопленные с запуска
+процесса: окно за нужный срок считает сам сервер через rate().
+
+Данные живут в памяти процесса: у каждого воркера gunicorn свои.
+"""
+import hmac
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.base import Template
+
+MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+TIMINGS = {
+    'wall_ms': MS_BUCKETS,
+    'sql_ms': MS_BUCKETS,
+    'template_ms': MS_BUCKETS,
+    'sql_queries': COUNT_BUCKETS,
+}
+COUNTERS = ('requests', 'sampled', 'cache_hits', 'cache_misses')
+
+_local = threading.local()
+_MISSING = object()
+
+
+def _bucket(buckets, value):
+    for position, bound in enumerate(buckets):
+        if value <= bound:
+            return position
+    return len(buckets)
+
+
+class Histogram:
+    """Гистограмма с запуска процесса: значения только растут."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[_bucket(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RollingHistogram:
+    """Гистограмма за окно window секунд из slots корзин по времени."""
+
+    def __init__(self, buckets, window, slots=10):
+        self.buckets = buckets
+        self.width = window / slots
+        self.slots = [None] * slots
+
+    def _slot(self, now):
+        tick = int(now // self.width)
+        index = tick % len(self.slots)
+        slot = self.slots[index]
+        if slot is None or slot[0] != tick:
+            slot = self.slots[index] = [
+                tick, [0] * (len(self.buckets) + 1), 0.0, 0
+            ]
+        return slot
+
+    def observe(self, value, now=None):
+        slot = self._slot(time.time() if now is None else now)
+        slot[1][_bucket(self.buckets, value)] += 1
+        slot[2] += value
+        slot[3] += 1
+
+    def snapshot(self, now=None):
+        """(счётчики по корзинам, сумма, количество) живых корзин."""
+        oldest = int((time.time() if now is None else now) // self.width) - (
+            len(self.slots) - 1
+        )
+        counts = [0] * (len(self.buckets) + 1)
+        total, count = 0.0, 0
+        for slot in self.slots:
+            if slot is None or slot[0] < oldest:
+                continue
+            counts = [a + b for a, b in zip(counts, slot[1])]
+            total += slot[2]
+            count += slot[3]
+        return counts, total, count
+
+    def quantile(self, fraction, now=None):
+        counts, _, count = self.snapshot(now)
+        if not count:
+            return None
+        rank = fraction * count
+        seen = 0
+        lower = 0
+        for bound, bucket in zip(self.buckets + (None,), counts):
+            if bucket and seen + bucket >= rank:
+                if bound is None:
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / bucket
+            seen += bucket
+            lower = bound if bound is not None else lower
+        return lower
+
+
+class ViewMetrics:
+    def __init__(self, window):
+        self.histograms = {
+            name: RollingHistogram(buckets, window)
+            for name, buckets in TIMINGS.items()
+        }
+        # Счётчик - гистограмма без границ: нужна только сумма за окно.
+        self.counters = {
+            name: RollingHistogram((), window) for name in COUNTERS
+        }
+        self.totals = {
+            name: Histogram(buckets) for name, buckets in TIMINGS.items()
+        }
+        self.counter_totals = dict.fromkeys(COUNTERS, 0)
+
+    def count(self, name, amount=1):
+        if amount:
+            self.counters[name].observe(amount)
+            self.counter_totals[name] += amount
+
+    def observe(self, name, value):
+        self.histograms[name].observe(value)
+        self.totals[name].observe(value)
+
+    def summary(self):
+        result = {}
+        for name, histogram in self.histograms.items():
+            _, total, count = histogram.snapshot()
+            result[name] = {
+                'count': count,
+                'mean': total / count if count else None,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+            }
+        for name, counter in self.counters.items():
+            result[name] = int(counter.snapshot()[1])
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(
+            lambda: ViewMetrics(settings.METRICS_WINDOW)
+        )
+
+    def record(self, url_name, sampled, recorder=None):
+        with self.lock:
+            metrics = self.views[url_name]
+            metrics.count('requests')
+            if not sampled:
+                return
+            metrics.count('sampled')
+            metrics.count('cache_hits', recorder.cache_hits)
+            metrics.count('cache_misses', recorder.cache_misses)
+            for name in TIMINGS:
+                metrics.observe(name, getattr(recorder, name))
+
+    def summary(self):
+        with self.lock:
+            return {
+                name: metrics.summary()
+                for name, metrics in sorted(self.views.items())
+            }
+
+    def prometheus(self):
+        lines = []
+        with self.lock:
+            views = sorted(self.views.items())
+            for name in TIMINGS:
+                metric = f'yatube_{name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for url_name, metrics in views:
+                    histogram = metrics.totals[name]
+                    total, count = histogram.total, histogram.count
+                    cumulative = 0
+                    for bound, bucket in zip(
+                        histogram.buckets + ('+Inf',), histogram.counts
+                    ):
+                        cumulative += bucket
+                        lines.append(
+                            f'{metric}_bucket{{view="{url_name}",'
+                            f'le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(f'{metric}_sum{{view="{url_name}"}} {total}')
+                    lines.append(
+                        f'{metric}_count{{view="{url_name}"}} {count}'
+                    )
+            for name in COUNTERS:
+                metric = f'yatube_{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                for url_name, metrics in views:
+                    value = metrics.counter_totals[name]
+                    lines.append(f'{metric}{{view="{url_name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+registry = Registry()
+
+
+class Recorder:
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.wall_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
+            self.sql_queries += 1
+
+
+def _current():
+    return getattr(_local, 'recorder', None)
+
+
+_template_render = Template.render
+
+
+def enabled():
+    return (
+        'yatube.metrics.MetricsMiddleware' in settings.MIDDLEWARE
+        and settings.METRICS_SAMPLE_RATE > 0
+    )
+
+
+def install():
+    """Замер отрисовки шаблонов; вызывается из AppConfig.ready()."""
+    if enabled():
+        Template.render = _timed_render
+
+
+def _timed_render(self, context):
+    recorder = _current()
+    if recorder is None:
+        return _template_render(self, context)
+    # {% include %} отрисовывает шаблон внутри другого: считаем внешний.
+    recorder.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _template_render(self, context)
+    finally:
+        recorder.template_depth -= 1
+        if not recorder.template_depth:
+            recorder.template_ms += (time.perf_counter() - started) * 1000
+
+
+def _instrument_cache(backend):
+    if getattr(backend, '_metrics_instrumented', False):
+        return
+    get, get_many = backend.get, backend.get_many
+
+    def counted_get(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        recorder = _current()
+        if recorder is not None:
+            if value is _MISSING:
+                recorder.cache_misses += 1
+            else:
+                recorder.cache_hits += 1
+        return default if value is _MISSING else value
+
+    def counted_get_many(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        recorder = _current()
+        if recorder is not None:
+            recorder.cache_hits += len(found)
+            recorder.cache_misses += len(keys) - len(found)
+        return found
+
+    backend.get = counted_get
+    backend.get_many = counted_get_many
+    backend._metrics_instrumented = True
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            response = self.get_response(request)
+            registry.record(self._url_name(request), sampled=False)
+            return response
+
+        recorder = Recorder()
+        for alias in settings.CACHES:
+            _instrument_cache(caches[alias])
+        _local.recorder = recorder
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _local.recorder = None
+        recorder.wall_ms = (time.perf_counter() - started) * 1000
+        registry.record(self._url_name(request), True, recorder)
+        return response
+
+    @staticmethod
+    def _url_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.view_name or match.url_name or 'unnamed'
+
+
+def _authorized(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and hmac.compare_digest(
+        header.encode(), f'Bearer {token}'.encode()
+    ):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def stats_view(request):
+    if not _authorized(request):
+        raise Http404
+    return JsonResponse(registry.summary())
+
+
+def prometheus_view(request):
+    if not _authorized(request):
+        raise Http404
+    return HttpResponse(
+        registry.prometheus(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,62 @@
+"""Независимые запросы страницы в пуле потоков.
+
+Django 2.2 не умеет асинхронных представлений, поэтому вместо async
+views запросы, не зависящие друг от друга, выполняются в потоках: у
+каждого потока своё соединение с базой, и страница ждёт самый медленный
+запрос, а не сумму всех. SQLite в режиме WAL читает параллельно, драйвер
+отпускает GIL на время запроса.
+
+Внутри транзакции чужие соединения не видят её незафиксированных строк,
+поэтому там, как и при PARALLEL_QUERIES = False, gather() выполняет всё
+по очереди в текущем потоке. Так же и когда запросы текущего соединения
+замеряются: execute_wrapper (yatube.metrics, yatube.querylog) и журнал
+запросов (DEBUG, assertNumQueries, manage.py benchmark) не видят
+соединений других потоков и недосчитались бы запросов.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PARALLEL_QUERY_WORKERS,
+            thread_name_prefix='query',
+        )
+    return _executor
+
+
+def _call(func):
+    try:
+        return func()
+    finally:
+        # Как request_finished: закрыть сломанное или старое соединение.
+        close_old_connections()
+
+
+def _inline():
+    return not settings.PARALLEL_QUERIES or any(
+        connection.in_atomic_block
+        or connection.execute_wrappers
+        or connection.queries_logged
+        for connection in connections.all()
+    )
+
+
+def gather(*calls):
+    """Результаты calls в том же порядке; исключение первого упавшего."""
+    if len(calls) < 2 or _inline():
+        return [call() for call in calls]
+    executor = _get_executor()
+    # Контекст запроса (выбор реплики в yatube.routers) нужен и в потоках.
+    futures = [
+        executor.submit(contextvars.copy_context().run, _call, call)
+        for call in calls
+    ]
+    return [future.result() for future in futures]
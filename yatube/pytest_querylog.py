@@ -0,0 +1,77 @@
+"""pytest-плагин: тест падает, если его запросы дали новый N+1.
+
+    python -m pytest --querylog
+    python -m pytest --querylog --querylog-update
+
+Известные N+1 перечислены в файле --querylog-baseline (по форме запроса
+на строку); --querylog-update дописывает в него найденные.
+"""
+import pytest
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('querylog', 'поиск N+1 в запросах к страницам')
+    group.addoption(
+        '--querylog', action='store_true',
+        help='падать на новых N+1 в запросах тестов'
+    )
+    group.addoption(
+        '--querylog-baseline', default='querylog_baseline.txt',
+        help='файл с уже известными формами N+1'
+    )
+    group.addoption(
+        '--querylog-update', action='store_true',
+        help='дописать найденные N+1 в файл и не падать'
+    )
+
+
+def _read_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as baseline:
+            return {line.rstrip('\n') for line in baseline if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def pytest_configure(config):
+    config._querylog_found = set()
+
+
+def pytest_unconfigure(config):
+    option = config.option
+    if getattr(option, 'querylog_update', False) and config._querylog_found:
+        known = _read_baseline(option.querylog_baseline)
+        with open(option.querylog_baseline, 'w', encoding='utf-8') as out:
+            for shape in sorted(known | config._querylog_found):
+                out.write(shape + '\n')
+
+
+@pytest.fixture(autouse=True)
+def _querylog(request):
+    config = request.config
+    if not config.getoption('querylog'):
+        yield
+        return
+    from yatube import querylog
+
+    found = []
+
+    def listener(inspector):
+        found.extend(
+            (inspector.label, shape) for shape in inspector.n_plus_one()
+        )
+
+    querylog.add_listener(listener)
+    try:
+        yield
+    finally:
+        querylog.remove_listener(listener)
+
+    known = _read_baseline(config.getoption('querylog_baseline'))
+    new = [(label, shape) for label, shape in found if shape.sql not in known]
+    if config.getoption('querylog_update'):
+        config._querylog_found.update(shape.sql for _, shape in new)
+    elif new:
+        pytest.fail('Новые N+1:\n' + '\n'.join(
+            f'{label}: {shape!r}' for label, shape in new
+        ), pytrace=False)
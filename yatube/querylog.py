@@ -0,0 +1,158 @@
+"""Журнал медленных запросов и поиск N+1.
+
+Внутри inspect() каждый SQL-запрос приводится к форме: строки и числа
+заменяются на ?, списки IN (...) сворачиваются. Запрос медленнее
+QUERYLOG_SLOW_MS пишется в лог вместе со строкой шаблона и строкой кода
+проекта, откуда он пришёл. Форма, повторённая за запрос не меньше
+QUERYLOG_N_PLUS_ONE раз, считается N+1.
+
+QueryLogMiddleware включается настройкой QUERYLOG_ENABLED или
+pytest-плагином yatube.pytest_querylog и иначе ничего не делает.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'IN \(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACE = re.compile(r'\s+')
+
+# Обёртки самих инструментов - не источник запроса.
+IGNORED_FILES = ('yatube/metrics.py', 'yatube/querylog.py')
+
+_listeners = []
+
+
+def normalize(sql):
+    """Форма запроса: без значений и с одинаковыми списками IN."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = PLACEHOLDER_LIST.sub('IN (...)', sql)
+    return SPACE.sub(' ', sql).strip()
+
+
+def _is_project(filename):
+    return (
+        filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in filename
+        and not filename.endswith(IGNORED_FILES)
+    )
+
+
+def trigger(skip=2):
+    """Откуда пришёл запрос: «шаблон:строка» и «файл:строка» проекта."""
+    template = code = None
+    frame = sys._getframe(skip)
+    while frame is not None and (template is None or code is None):
+        node = frame.f_locals.get('self')
+        if (
+            template is None
+            and frame.f_code.co_name == 'render_annotated'
+            and isinstance(node, Node)
+            and getattr(node, 'token', None) is not None
+        ):
+            origin = getattr(node, 'origin', None)
+            name = origin.name if origin is not None else '?'
+            template = f'{name}:{node.token.lineno}'
+        if code is None and _is_project(frame.f_code.co_filename):
+            path = os.path.relpath(frame.f_code.co_filename, settings.BASE_DIR)
+            code = f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ', '.join(filter(None, (template, code))) or 'неизвестно'
+
+
+class Shape:
+    def __init__(self, sql, source):
+        self.sql = sql
+        self.source = source
+        self.count = 0
+        self.total_ms = 0.0
+
+    def __repr__(self):
+        return f'{self.count} x {self.sql} ({self.source})'
+
+
+class Inspector:
+    def __init__(self, label=''):
+        self.label = label
+        self.slow_ms = settings.QUERYLOG_SLOW_MS
+        self.threshold = settings.QUERYLOG_N_PLUS_ONE
+        self.shapes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.record(sql, duration)
+
+    def record(self, sql, duration):
+        normalized = normalize(sql)
+        shape = self.shapes.get(normalized)
+        if shape is None:
+            shape = self.shapes[normalized] = Shape(normalized, trigger(3))
+        shape.count += 1
+        shape.total_ms += duration
+        if duration >= self.slow_ms:
+            logger.warning(
+                'Медленный запрос %.1f мс в %s: %s (%s)',
+                duration, self.label or '-', sql, trigger(3)
+            )
+
+    @property
+    def query_count(self):
+        return sum(shape.count for shape in self.shapes.values())
+
+    def n_plus_one(self):
+        return [
+            shape for shape in self.shapes.values()
+            if shape.count >= self.threshold
+        ]
+
+
+@contextmanager
+def inspect(label=''):
+    inspector = Inspector(label)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(inspector))
+        yield inspector
+    for shape in inspector.n_plus_one():
+        logger.warning('N+1 в %s: %r', inspector.label or '-', shape)
+    for listener in _listeners:
+        listener(inspector)
+
+
+def add_listener(listener):
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+
+class QueryLogMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.QUERYLOG_ENABLED or _listeners):
+            return self.get_response(request)
+        with inspect(request.path) as inspector:
+            response = self.get_response(request)
+            match = getattr(request, 'resolver_match', None)
+            if match is not None and match.view_name:
+                inspector.label = match.view_name
+        return response
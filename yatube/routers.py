@@ -0,0 +1,130 @@
+"""Чтение лент с реплик базы.
+
+Реплики перечислены в DATABASE_REPLICAS: это алиасы DATABASES с копией
+основной базы. Запросы на чтение уходят на реплику только внутри
+представлений с декоратором replica_reads, одна реплика на весь запрос,
+чтобы страницы курсора не скакали между копиями. Всё остальное, включая
+сессии и любые записи, идёт в основную базу.
+
+Реплика отстаёт, поэтому после своей записи пользователь не должен
+видеть старую ленту. Если запрос что-то записал, ReplicaMiddleware
+ставит cookie на REPLICA_PIN_SECONDS, и пока она жива, все чтения этого
+пользователя идут в основную базу. Внутри самого запроса после первой
+записи чтения тоже идут туда.
+
+По той же причине ответ, прочитанный с реплики, нельзя класть в кеш под
+только что выданной версией пространства: см. posts.cache.storable().
+"""
+import contextvars
+import random
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_pin'
+
+# Сессию только что вошедшего пользователя реплика может ещё не знать.
+PRIMARY_APPS = ('sessions',)
+
+
+class _State:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.allowed = False
+        self.wrote = False
+        self.replica = None
+
+
+_state = contextvars.ContextVar('replica_state', default=None)
+
+
+def _replica(model):
+    state = _state.get()
+    if (
+        state is None
+        or not state.allowed
+        or state.pinned
+        or state.wrote
+        or model._meta.app_label in PRIMARY_APPS
+        or not settings.DATABASE_REPLICAS
+    ):
+        return None
+    if state.replica is None:
+        state.replica = random.choice(settings.DATABASE_REPLICAS)
+    return state.replica
+
+
+def reading_replica():
+    """Читает ли текущий запрос с реплики (или начнёт при первом чтении)."""
+    state = _state.get()
+    if state is None:
+        return False
+    if state.replica is not None:
+        return True
+    return bool(
+        state.allowed
+        and not state.pinned
+        and not state.wrote
+        and settings.DATABASE_REPLICAS
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica(model)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика - копия основной базы, связи между ними допустимы.
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплику вместе с данными.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def replica_reads(view):
+    """Разрешает представлению читать с реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        state.allowed = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.allowed = False
+    return wrapper
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        state = _State(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -6,10 +6,29 @@ SECRET_KEY = '+!-d@=&#th2-ym)&zac=f$2dymny*vfl&ctcd+y#v(^m8tiju='
 
 DEBUG = False
 
-CACHES = {
-    'default': {
+# Несколько воркеров на одном узле должны делить кеш: для них
+# YATUBE_CACHE=sqlite (по умолчанию в Dockerfile) или file.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'yatube.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
 }
 ALLOWED_HOSTS = [
     'localhost',
@@ -22,6 +41,8 @@ INSTALLED_APPS = [
     'about',
     'users',
     'posts',
+    'tasks',
+    'yatube',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -33,6 +54,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.querylog.QueryLogMiddleware',
+    'yatube.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,13 +93,40 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
+# yatube.sqlite3 выполняет pragmas на каждом новом соединении, а
+# CONN_MAX_AGE держит соединение открытым между запросами.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'pragmas': SQLITE_PRAGMAS,
+        },
     }
 }
 
+# Независимые запросы страниц профиля и поста идут параллельно в пуле
+# из PARALLEL_QUERY_WORKERS потоков (см. yatube.parallel).
+PARALLEL_QUERIES = True
+PARALLEL_QUERY_WORKERS = 8
+
+# Алиасы DATABASES с копиями основной базы для чтения лент (см.
+# yatube.routers). После своей записи пользователь читает из основной
+# базы ещё REPLICA_PIN_SECONDS секунд.
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 10
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,6 +166,72 @@ LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 LOGOUT_REDIRECT_URL = "index"
 
+# Фрагменты лент сбрасываются сменой версии при записи, поэтому
+# время жизни ограничивает только объём кеша.
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты подмешиваются в /follow/ при чтении.
+FEED_FANOUT_LIMIT = 1000
+# Раскладка по лентам для авторов с числом подписчиков больше этого
+# порога выполняется воркером run_tasks, а не в запросе.
+FEED_SYNC_FANOUT_LIMIT = 100
+
+# Кеш целых страниц для анонимных посетителей: время жизни копии в
+# кеше и max-age для браузеров и прокси.
+ANON_PAGE_CACHE = True
+ANON_PAGE_CACHE_TIMEOUT = 60 * 60
+ANON_PAGE_MAX_AGE = 60
+
+# Фоновые задачи выполняет воркер manage.py run_tasks. Без воркера
+# (YATUBE_TASKS_EAGER=1) TASKS_EAGER выполняет их сразу в запросе.
+TASKS_EAGER = os.environ.get('YATUBE_TASKS_EAGER') == '1'
+TASKS_RETRY_DELAY = 10
+TASKS_LOCK_TIMEOUT = 300
+TASKS_KEEP_DONE = 24 * 60 * 60
+
+# Сколько постов за раз отдаёт /api/v1/delta/ (новое с прошлого опроса).
+FEED_DELTA_LIMIT = 100
+
+# Сколько лучших результатов поиска показывать.
+SEARCH_RESULTS = 50
+
+# Популярное: вес комментария убывает вдвое за TRENDING_HALF_LIFE
+# секунд, посты без комментариев за TRENDING_MAX_AGE выпадают из списка.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_MAX_AGE = 7 * 24 * 60 * 60
+TRENDING_SIZE = 50
+
+# Поток новых постов (posts.events): опрос базы, если в процессе не было
+# событий, время жизни соединения и очередь событий одного клиента.
+# Под WSGI открытый поток занимает воркер сервера на всё время жизни,
+# поэтому поток и баннер на лентах включаются явно (YATUBE_LIVE=1).
+EVENTS_ENABLED = os.environ.get('YATUBE_LIVE') == '1'
+EVENTS_POLL_INTERVAL = 5
+EVENTS_STREAM_SECONDS = 5 * 60
+EVENTS_QUEUE_SIZE = 100
+
+# Метрики запросов (yatube.metrics): доля замеряемых запросов, окно
+# гистограмм в секундах и токен для скрейпера Prometheus.
+METRICS_SAMPLE_RATE = float(os.environ.get('YATUBE_METRICS_SAMPLE', 0.1))
+METRICS_WINDOW = 300
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
+# Журнал запросов (yatube.querylog): порог медленного запроса в мс и
+# число повторов одной формы запроса, после которого это N+1.
+QUERYLOG_ENABLED = os.environ.get('YATUBE_QUERYLOG') == '1'
+QUERYLOG_SLOW_MS = 100
+QUERYLOG_N_PLUS_ONE = 5
+
+# Пределы для manage.py benchmark: p99 времени ответа и число запросов.
+BENCHMARK_BUDGETS = {
+    'index': {'p99_ms': 250, 'queries': 8},
+    'group_posts': {'p99_ms': 250, 'queries': 8},
+    'profile': {'p99_ms': 250, 'queries': 8},
+    'post_view': {'p99_ms': 250, 'queries': 8},
+    'follow_index': {'p99_ms': 250, 'queries': 12},
+}
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
@@ -0,0 +1,35 @@
+"""SQLite для боевой нагрузки: WAL, прагмы соединения и запись по очереди.
+
+Подключается как ENGINE 'yatube.sqlite3'. Прагмы из OPTIONS['pragmas']
+выполняются на каждом новом соединении; вместе с CONN_MAX_AGE соединение
+живёт между запросами, и прагмы не повторяются на каждый запрос.
+
+В режиме WAL читатели не ждут писателя, но писатель у базы один. Обычная
+транзакция SQLite начинается как читающая и берёт блокировку записи
+только на первом INSERT; если за это время писал кто-то ещё, SQLite сразу
+отвечает «database is locked», не дожидаясь busy_timeout. serialized()
+начинает транзакцию с BEGIN IMMEDIATE: блокировка записи берётся в
+начале, а конкурирующий писатель честно ждёт своей очереди.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+@contextmanager
+def serialized(using=None):
+    """transaction.atomic(), который сразу занимает запись в SQLite."""
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    immediate = (
+        connection.vendor == 'sqlite'
+        and not connection.in_atomic_block
+        and hasattr(connection, 'begin_immediate')
+    )
+    if immediate:
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using):
+            yield
+    finally:
+        if immediate:
+            connection.begin_immediate = False
@@ -0,0 +1,30 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.begin_immediate = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Свои ключи OPTIONS, sqlite3.connect() их не знает.
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        # busy_timeout первым: смена журнала тоже может ждать блокировку.
+        pragmas = sorted(
+            self.pragmas.items(), key=lambda item: item[0] != 'busy_timeout'
+        )
+        for name, value in pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.begin_immediate or self.transaction_mode == 'IMMEDIATE':
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from yatube import metrics
+
 from django.conf.urls import handler404, handler500
 
 handler404 = "posts.views.page_not_found"  # noqa
@@ -13,6 +15,10 @@ urlpatterns = [
     path("about/", include("about.urls", namespace="about")),
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
+    path("metrics/", metrics.stats_view, name="metrics"),
+    path("metrics/prometheus/", metrics.prometheus_view,
+         name="metrics_prometheus"),
+    path("api/v1/", include("posts.api_urls", namespace="api")),
     path("", include("posts.urls")),
 ]
 if settings.DEBUG: